@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+import pandas as pd
+
+# Local store of raw (unadjusted) daily candles, keyed by instrument.
+# Upstox instrument keys (NSE_EQ|INE...) and plain yfinance symbols both work.
+
+DATA_DIR = os.environ.get('SCREENER_DATA_DIR', 'data')
+DB_PATH = os.path.join(DATA_DIR, 'market.db')
+
+CANDLE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'OI']
+
+# Pipelined fetchers, strategy workers and publish threads write from their own
+# connections; every write to market.db and results.db queues on this lock
+# instead of racing for SQLite's write lock.
+WRITE_LOCK = threading.RLock()
+
+_RENAME = {'vol': 'Volume', 'oi': 'OI', 'Adj Close': None}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    instrument TEXT NOT NULL,
+    date       TEXT NOT NULL,
+    open       REAL,
+    high       REAL,
+    low        REAL,
+    close      REAL,
+    volume     REAL,
+    oi         REAL,
+    PRIMARY KEY (instrument, date)
+) WITHOUT ROWID;
+"""
+
+
+# ==============================
+# CONNECTION
+# ==============================
+def connect(path=DB_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30.0)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    with WRITE_LOCK:
+        conn.executescript(_SCHEMA)
+    return conn
+
+
+@contextmanager
+def writing(conn):
+    # with writing(conn): ... -> one transaction, one writer per process
+    with WRITE_LOCK, conn:
+        yield conn
+
+
+# ==============================
+# WRITE
+# ==============================
+def save_candles(conn, instrument, df):
+
+    if df is None or df.empty:
+        return 0
+
+    df = df.rename(columns={k: v for k, v in _RENAME.items() if v})
+    dates = pd.DatetimeIndex(df.index).strftime('%Y-%m-%d')
+
+    rows = [
+        (instrument, d, o, h, l, c, v, oi)
+        for d, o, h, l, c, v, oi in zip(
+            dates,
+            df['Open'], df['High'], df['Low'], df['Close'],
+            df['Volume'] if 'Volume' in df else [None] * len(df),
+            df['OI'] if 'OI' in df else [None] * len(df),
+        )
+    ]
+
+    with writing(conn):
+        conn.executemany('INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    return len(rows)
+
+
+# ==============================
+# READ
+# ==============================
+def load_candles(conn, instrument, start=None, end=None, tz='Asia/Kolkata'):
+
+    query = 'SELECT date, open, high, low, close, volume, oi FROM candles WHERE instrument = ?'
+    params = [instrument]
+    if start is not None:
+        query += ' AND date >= ?'
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+    if end is not None:
+        query += ' AND date <= ?'
+        params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+    query += ' ORDER BY date'
+
+    rows = conn.execute(query, params).fetchall()
+    df = pd.DataFrame(rows, columns=['date'] + CANDLE_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    if tz:
+        df['date'] = df['date'].dt.tz_localize(tz)
+    df.set_index('date', inplace=True)
+    return df
+
+
+def candle_dates(conn, instrument):
+    rows = conn.execute('SELECT date FROM candles WHERE instrument = ? ORDER BY date', (instrument,)).fetchall()
+    return pd.to_datetime([r[0] for r in rows])
+
+
+def last_candle_date(conn, instrument):
+    row = conn.execute('SELECT MAX(date) FROM candles WHERE instrument = ?', (instrument,)).fetchone()
+    return pd.Timestamp(row[0]) if row and row[0] else None
+
+
+def list_instruments(conn):
+    return [r[0] for r in conn.execute('SELECT DISTINCT instrument FROM candles ORDER BY instrument')]
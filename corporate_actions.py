@@ -0,0 +1,183 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+import candle_store
+import indicators
+
+# Split / bonus factors per instrument, applied on read as a multiplicative view
+# over the raw candles in candle_store. Bars dated before an ex-date are scaled
+# by the product of every later action's factor; nothing is ever refetched.
+#
+#   split 10 -> 2 face value : factor = 2 / 10
+#   bonus 1:1 (1 new per 1 held): factor = 1 / (1 + 1)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS corporate_actions (
+    instrument TEXT NOT NULL,
+    ex_date    TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    factor     REAL NOT NULL,
+    note       TEXT,
+    PRIMARY KEY (instrument, ex_date, kind)
+);
+"""
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+VOLUME_COLUMNS = ['Volume', 'vol']
+
+
+def _ensure_schema(conn):
+    with candle_store.WRITE_LOCK:
+        conn.executescript(_SCHEMA)
+
+
+# ==============================
+# RECORD ACTIONS
+# ==============================
+def add_action(conn, instrument, ex_date, factor, kind, note=None):
+
+    if factor <= 0:
+        raise ValueError(f"Invalid adjustment factor {factor} for {instrument}")
+
+    _ensure_schema(conn)
+    with candle_store.writing(conn):
+        conn.execute(
+            'INSERT OR REPLACE INTO corporate_actions VALUES (?, ?, ?, ?, ?)',
+            (instrument, pd.Timestamp(ex_date).strftime('%Y-%m-%d'), kind, float(factor), note),
+        )
+
+    # Only this instrument's derived data is stale; raw candles stay as they are.
+    indicators.invalidate(instrument)
+
+
+def add_split(conn, instrument, ex_date, old_face_value, new_face_value):
+    factor = new_face_value / old_face_value
+    add_action(conn, instrument, ex_date, factor, 'split', f"FV {old_face_value} -> {new_face_value}")
+
+
+def add_bonus(conn, instrument, ex_date, new_shares, held_shares):
+    factor = held_shares / (held_shares + new_shares)
+    add_action(conn, instrument, ex_date, factor, 'bonus', f"{new_shares}:{held_shares}")
+
+
+def remove_action(conn, instrument, ex_date, kind):
+    _ensure_schema(conn)
+    with candle_store.writing(conn):
+        conn.execute(
+            'DELETE FROM corporate_actions WHERE instrument = ? AND ex_date = ? AND kind = ?',
+            (instrument, pd.Timestamp(ex_date).strftime('%Y-%m-%d'), kind),
+        )
+    indicators.invalidate(instrument)
+
+
+def load_actions(conn, instrument=None):
+    _ensure_schema(conn)
+    query = 'SELECT instrument, ex_date, kind, factor, note FROM corporate_actions'
+    params = []
+    if instrument is not None:
+        query += ' WHERE instrument = ?'
+        params.append(instrument)
+    query += ' ORDER BY instrument, ex_date'
+    df = pd.DataFrame(conn.execute(query, params).fetchall(), columns=['instrument', 'ex_date', 'kind', 'factor', 'note'])
+    df['ex_date'] = pd.to_datetime(df['ex_date'])
+    return df
+
+
+# ==============================
+# ADJUSTED VIEW
+# ==============================
+def adjustment_factors(dates, actions):
+
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    dates = dates.normalize()
+
+    if actions.empty:
+        return np.ones(len(dates))
+
+    actions = actions.sort_values('ex_date')
+    ex_dates = actions['ex_date'].to_numpy(dtype='datetime64[ns]')
+    # suffix[i] = product of factors of actions i.. ; a bar is scaled by every action after it
+    suffix = np.append(np.cumprod(actions['factor'].to_numpy()[::-1])[::-1], 1.0)
+    first_later = np.searchsorted(ex_dates, dates.to_numpy(dtype='datetime64[ns]'), side='right')
+    return suffix[first_later]
+
+
+def apply_adjustments(df, actions):
+
+    if df is None or df.empty or actions.empty:
+        return df
+
+    factors = adjustment_factors(df.index, actions)
+    if np.all(factors == 1.0):
+        return df
+
+    df = df.copy()
+    for col in PRICE_COLUMNS:
+        if col in df:
+            df[col] = df[col] * factors
+    for col in VOLUME_COLUMNS:
+        if col in df:
+            df[col] = df[col] / factors
+    return df
+
+
+def adjust(conn, instrument, df):
+    return apply_adjustments(df, load_actions(conn, instrument))
+
+
+def save_and_adjust(instrument, df, conn=None):
+    # Fetchers keep the raw candles in the local store and work on the adjusted view.
+    own = conn is None
+    conn = conn or candle_store.connect()
+    try:
+        candle_store.save_candles(conn, instrument, df)
+        return adjust(conn, instrument, df)
+    finally:
+        if own:
+            conn.close()
+
+
+def load_adjusted_candles(conn, instrument, start=None, end=None):
+    return adjust(conn, instrument, candle_store.load_candles(conn, instrument, start=start, end=end))
+
+
+# ==============================
+# CLI
+# ==============================
+def main():
+    parser = argparse.ArgumentParser(description="Record split / bonus actions for stored instruments")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    split = sub.add_parser('split')
+    split.add_argument('instrument')
+    split.add_argument('ex_date')
+    split.add_argument('old_face_value', type=float)
+    split.add_argument('new_face_value', type=float)
+
+    bonus = sub.add_parser('bonus')
+    bonus.add_argument('instrument')
+    bonus.add_argument('ex_date')
+    bonus.add_argument('new_shares', type=float)
+    bonus.add_argument('held_shares', type=float)
+
+    show = sub.add_parser('list')
+    show.add_argument('instrument', nargs='?')
+
+    args = parser.parse_args()
+    conn = candle_store.connect()
+
+    if args.cmd == 'split':
+        add_split(conn, args.instrument, args.ex_date, args.old_face_value, args.new_face_value)
+        print(f"✅ Split recorded for {args.instrument}")
+    elif args.cmd == 'bonus':
+        add_bonus(conn, args.instrument, args.ex_date, args.new_shares, args.held_shares)
+        print(f"✅ Bonus recorded for {args.instrument}")
+    else:
+        print(load_actions(conn, args.instrument).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+import candle_store
+import instrument_master
+import price_panel
+import results_sink
+
+# Rolling return correlation / covariance across the whole price panel.
+#
+# The window of daily log returns is kept as pairwise running sums
+# (sum x, sum x^2, sum xy and the count of bars where both symbols traded), so
+# a new bar is one rank-1 add and the bar leaving the window one rank-1
+# subtract: O(n^2) per day instead of a fresh O(window * n^2) corr. Pairs use
+# pairwise-complete bars like DataFrame.corr, and the sums are rebuilt from the
+# window every REBUILD_EVERY bars to stop float drift.
+#
+#   python correlation.py update                       advance data/correlation/state.npz over new panel bars
+#   python correlation.py clusters ETF.csv [--save]    groups of instruments that move together
+#   python correlation.py dedupe SRT-ETF               one symbol per group in the latest ledger run
+#
+# Clusters are leader-based: symbols are taken in list order, each unassigned
+# symbol leads a new cluster and collects every unassigned symbol correlated
+# with it at or above the threshold. Every member is therefore close to its
+# leader (no single-linkage chaining), and de-duplicating a signal list is a
+# dictionary lookup per row.
+
+STATE_PATH = os.path.join(candle_store.DATA_DIR, 'correlation', 'state.npz')
+
+WINDOW = 60
+MIN_OBS = 40
+REBUILD_EVERY = 250
+THRESHOLD = 0.90
+
+
+# ==============================
+# ROLLING SUMS
+# ==============================
+def _contributions(rows):
+    # rows: (k, n) returns, NaN = no bar
+    valid = ~np.isnan(rows)
+    x = np.where(valid, rows, 0.0)
+    m = valid.astype(float)
+    return x.T @ m, (x * x).T @ m, x.T @ x, m.T @ m
+
+
+class RollingCorrelation:
+
+    def __init__(self, symbols, window=WINDOW):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.window = window
+        self.ring = np.full((window, n), np.nan)
+        self.head = 0                 # next ring slot to overwrite
+        self.filled = 0
+        self.pushes = 0               # since the last rebuild
+        self.last_date = None
+        self.last_close = np.full(n, np.nan)
+        self.build_id = None          # price panel build the state was computed from
+        self.sx = np.zeros((n, n))    # sx[i, j] = sum of x_i over bars where i and j both traded
+        self.sxx = np.zeros((n, n))
+        self.sxy = np.zeros((n, n))
+        self.count = np.zeros((n, n))
+
+    def push(self, returns):
+        x = np.asarray(returns, dtype=float)[None, :]
+        if self.filled == self.window:
+            old = self.ring[self.head][None, :]
+            for total, part in zip((self.sx, self.sxx, self.sxy, self.count), _contributions(old)):
+                total -= part
+        for total, part in zip((self.sx, self.sxx, self.sxy, self.count), _contributions(x)):
+            total += part
+
+        self.ring[self.head] = x[0]
+        self.head = (self.head + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+        self.pushes += 1
+        if self.pushes >= REBUILD_EVERY:
+            self.rebuild()
+
+    def rebuild(self):
+        # unfilled ring rows are all NaN and contribute nothing
+        self.sx, self.sxx, self.sxy, self.count = _contributions(self.ring)
+        self.pushes = 0
+
+    def advance(self, dates, closes):
+        # closes: (k, n) Close rows for dates after last_date
+        for date, close in zip(dates, closes):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.push(np.log(close / self.last_close))
+            self.last_close = close
+            self.last_date = pd.Timestamp(date)
+
+    # ------------------------------
+    # matrices
+    # ------------------------------
+    def covariance(self, min_obs=MIN_OBS):
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (self.sxy - self.sx * self.sx.T / n) / (n - 1)
+        cov[n < min_obs] = np.nan
+        return pd.DataFrame(cov, index=self.symbols, columns=self.symbols)
+
+    def correlation(self, min_obs=MIN_OBS):
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.sxy - self.sx * self.sx.T / n
+            var = self.sxx - self.sx ** 2 / n      # var[i, j]: x_i over the bars shared with j
+            corr = cov / np.sqrt(var * var.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        corr[n < min_obs] = np.nan
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+    # ------------------------------
+    # persistence
+    # ------------------------------
+    def save(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(
+            tmp, symbols=np.array(self.symbols), window=self.window, ring=self.ring, head=self.head,
+            filled=self.filled, pushes=self.pushes, last_close=self.last_close,
+            last_date=np.datetime64(self.last_date, 'D'), build_id=str(self.build_id), sx=self.sx, sxx=self.sxx, sxy=self.sxy, count=self.count,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path) as f:
+            state = cls(f['symbols'].tolist(), int(f['window']))
+            state.ring = f['ring']
+            state.head, state.filled, state.pushes = int(f['head']), int(f['filled']), int(f['pushes'])
+            state.last_close = f['last_close']
+            state.last_date = pd.Timestamp(f['last_date'][()])
+            state.build_id = str(f['build_id']) if 'build_id' in f else None
+            state.sx, state.sxx, state.sxy, state.count = f['sx'], f['sxx'], f['sxy'], f['count']
+        return state
+
+
+def _matches_panel(state, panel, dates, close, window):
+    # a rebuilt panel (adjusted closes after a split / bonus) or closes that no
+    # longer match the stored last bar would push split-sized fake returns
+    if state.symbols != list(panel.symbols) or state.window != window:
+        return False
+    if state.build_id != str(panel.build_id):
+        return False
+    row = dates.searchsorted(state.last_date)
+    if row >= len(dates) or dates[row] != state.last_date:
+        return False
+    return np.allclose(close[row], state.last_close, rtol=1e-9, atol=0, equal_nan=True)
+
+
+def update(panel, path=STATE_PATH, window=WINDOW):
+    # advance the stored state over panel rows it has not seen; a new symbol
+    # set, window or panel build (or changed closes) rebuilds from the last
+    # window + 1 rows
+    dates = panel.dates
+    close = panel.field('Close')
+
+    state = None
+    if os.path.exists(path):
+        state = RollingCorrelation.load(path)
+        if not _matches_panel(state, panel, dates, close, window):
+            state = None
+
+    if state is None:
+        start = max(0, len(dates) - window - 1)
+        state = RollingCorrelation(panel.symbols, window)
+        state.build_id = str(panel.build_id)
+        state.last_close = np.array(close[start])
+        state.last_date = dates[start]
+        state.advance(dates[start + 1:], np.array(close[start + 1:]))
+        state.rebuild()
+    else:
+        start = int(dates.searchsorted(state.last_date, side='right'))
+        state.advance(dates[start:], np.array(close[start:]))
+
+    state.save(path)
+    return state
+
+
+# ==============================
+# CLUSTERS / DE-DUPLICATION
+# ==============================
+def clusters(corr, threshold=THRESHOLD, order=None):
+    # -> DataFrame indexed by symbol: CLUSTER, LEADER, CORR_TO_LEADER, CLUSTER_SIZE
+    order = list(order) if order is not None else list(corr.index)
+    values = corr.reindex(index=order, columns=order).to_numpy()
+    close = np.nan_to_num(values, nan=-1.0) >= threshold
+
+    cluster = np.full(len(order), -1)
+    leader = np.zeros(len(order), dtype=int)
+    next_id = 0
+    for i in range(len(order)):
+        if cluster[i] >= 0:
+            continue
+        members = np.flatnonzero(close[i] & (cluster < 0))
+        members = np.union1d(members, [i])
+        cluster[members] = next_id
+        leader[members] = i
+        next_id += 1
+
+    out = pd.DataFrame({
+        'CLUSTER': cluster,
+        'LEADER': [order[j] for j in leader],
+        'CORR_TO_LEADER': values[np.arange(len(order)), leader].round(3),
+    }, index=pd.Index(order, name='SYMBOL'))
+    out['CLUSTER_SIZE'] = out.groupby('CLUSTER')['CLUSTER'].transform('size')
+    return out
+
+
+def dedupe(df, groups, symbol_col='Stock'):
+    # keep the rows of the first symbol seen from each cluster; symbols
+    # without a cluster are kept
+    cluster = df[symbol_col].map(groups['CLUSTER'])
+    first = df[symbol_col].groupby(cluster).transform('first')
+    return df[cluster.isna() | (df[symbol_col] == first)]
+
+
+# ==============================
+# UNIVERSE
+# ==============================
+def load_universe(lists):
+    # -> DataFrame indexed by trading symbol: instrument_key (+ UNDERLYING for ETF.csv)
+    frames = []
+    for path in lists:
+        df = pd.read_csv(path)
+        df.columns = df.columns.str.strip()
+        df = df.rename(columns={'SYMBOL': 'Symbol', 'UNDERLYING ASSET': 'UNDERLYING'})
+        df['Symbol'] = df['Symbol'].str.strip()
+        frames.append(df[[c for c in ['Symbol', 'UNDERLYING'] if c in df]])
+    universe = pd.concat(frames).drop_duplicates(subset='Symbol').set_index('Symbol')
+
+    master = instrument_master.load_master()
+    keys = master.assign(Symbol=master['tradingsymbol'].str.replace('-EQ', '', regex=False))
+    keys = keys.drop_duplicates(subset='Symbol').set_index('Symbol')['instrument_key']
+    universe['instrument_key'] = keys.reindex(universe.index)
+    return universe.dropna(subset=['instrument_key'])
+
+
+def universe_clusters(state, lists, threshold=THRESHOLD):
+    universe = load_universe(lists)
+    universe = universe[universe['instrument_key'].isin(state.symbols)]
+    corr = state.correlation().loc[universe['instrument_key'], universe['instrument_key']]
+    corr.index = corr.columns = universe.index
+    out = clusters(corr, threshold)
+    if 'UNDERLYING' in universe:
+        out['UNDERLYING'] = universe['UNDERLYING'].reindex(out.index)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling return correlation and co-movement clusters")
+    sub = parser.add_subparsers(dest='command', required=True)
+    up = sub.add_parser('update')
+    up.add_argument('--window', type=int, default=WINDOW)
+    cl = sub.add_parser('clusters')
+    cl.add_argument('lists', nargs='*', default=['ETF.csv'])
+    cl.add_argument('--threshold', type=float, default=THRESHOLD)
+    cl.add_argument('--output', default='CLUSTERS-ETF', help='output name in the results store')
+    cl.add_argument('--save', action='store_true', help='record the clusters in the results store')
+    dd = sub.add_parser('dedupe')
+    dd.add_argument('output', help='results store output to de-duplicate, e.g. SRT-ETF')
+    dd.add_argument('lists', nargs='*', default=['ETF.csv'])
+    dd.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    panel = price_panel.open_panel()
+    if panel is None:
+        print(f"⚠️ No panel at {price_panel.PANEL_DIR}; run 'python price_panel.py build'")
+        return
+
+    if args.command == 'update':
+        state = update(panel, window=args.window)
+        print(f"✅ Correlation state: {len(state.symbols)} symbols, {state.filled}-bar window to {state.last_date:%d-%b-%Y}")
+        return
+
+    state = update(panel)
+    groups = universe_clusters(state, args.lists, args.threshold)
+
+    if args.command == 'clusters':
+        shared = groups[groups['CLUSTER_SIZE'] > 1].sort_values(['CLUSTER', 'CORR_TO_LEADER'], ascending=[True, False])
+        print(f"🔍 {groups['CLUSTER'].nunique()} clusters from {len(groups)} symbols (corr >= {args.threshold})")
+        with pd.option_context('display.width', 200, 'display.max_rows', None):
+            print(shared.to_string())
+        if args.save:
+            results_sink.record_outputs('correlation', {args.output: groups.reset_index()})
+        return
+
+    conn = results_sink.connect()
+    try:
+        ledger = results_sink.read_output(conn, args.output)
+    finally:
+        conn.close()
+    if ledger.empty:
+        print(f"⚠️ No rows for {args.output}")
+        return
+    ledger = ledger[ledger['run_id'] == ledger['run_id'].max()]
+    symbol_col = results_sink._first_present(ledger, results_sink.SYMBOL_COLUMNS)
+    kept = dedupe(ledger, groups, symbol_col)
+    print(f"✅ {ledger[symbol_col].nunique()} -> {kept[symbol_col].nunique()} symbols after de-duplication")
+    with pd.option_context('display.width', 200, 'display.max_rows', None):
+        print(kept.drop(columns=['run_id', 'run_date'], errors='ignore').to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
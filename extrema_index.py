@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Range-extrema index over one symbol's High / Low series.
+#
+# Sparse tables of argmax / argmin positions answer "highest high (or lowest
+# low) in bars [start, stop) and when" in O(1) after an O(n log n) build, so
+# 20D, 52W and all-time extremes come from the same index instead of full
+# rolling(20) columns and boolean-mask scans. Ties resolve to the earliest bar,
+# like idxmax / idxmin. NaN bars never win a query, so a window holding a NaN
+# still has an extreme where rolling(20) would give NaN - drop missing bars
+# (e.g. the pre-listing rows of a multi-ticker download) before indexing.
+#
+#   idx = ExtremaIndex(df['High'], df['Low'])
+#   idx.high_in(*idx.last(20))         -> (value, date) of the 20-bar high
+#   idx.low_in(*idx.since(one_year))   -> (value, date) of the 52-week low
+
+
+def _sparse_table(values, better):
+    # table[k][i] = position of the best value in values[i : i + 2**k]
+    n = len(values)
+    levels = [np.arange(n)]
+    span = 1
+    while span * 2 <= n:
+        prev = levels[-1]
+        left = prev[:n - span * 2 + 1]
+        right = prev[span:n - span + 1]
+        levels.append(np.where(better(values[right], values[left]), right, left))
+        span *= 2
+    return levels
+
+
+class ExtremaIndex:
+
+    def __init__(self, high, low=None, dates=None):
+        if dates is None:
+            dates = high.index if isinstance(high, pd.Series) else None
+        self.dates = dates
+        self.high = np.asarray(high, dtype=float)
+        self.low = np.asarray(low if low is not None else high, dtype=float)
+        self._hi = np.where(np.isnan(self.high), -np.inf, self.high)
+        self._lo = np.where(np.isnan(self.low), np.inf, self.low)
+        # strict comparisons keep the left (earlier) position on ties
+        self._max = _sparse_table(self._hi, np.greater)
+        self._min = _sparse_table(self._lo, np.less)
+
+    def __len__(self):
+        return len(self.high)
+
+    # ------------------------------
+    # windows -> (start, stop)
+    # ------------------------------
+    def last(self, bars, end=None):
+        stop = len(self) if end is None else end
+        return max(0, stop - bars), stop
+
+    def since(self, date):
+        # numpy promotes mixed datetime units (the panel stores whole days)
+        return int(np.searchsorted(self.dates.values, pd.Timestamp(date).to_datetime64())), len(self)
+
+    def after(self, pos):
+        return pos + 1, len(self)
+
+    # ------------------------------
+    # O(1) queries
+    # ------------------------------
+    def _query(self, table, values, start, stop, better):
+        if stop <= start:
+            return None
+        k = (stop - start).bit_length() - 1
+        left = table[k][start]
+        right = table[k][stop - (1 << k)]
+        return right if better(values[right], values[left]) else left
+
+    def argmax(self, start, stop):
+        return self._query(self._max, self._hi, start, stop, np.greater)
+
+    def argmin(self, start, stop):
+        return self._query(self._min, self._lo, start, stop, np.less)
+
+    def max(self, start, stop):
+        pos = self.argmax(start, stop)
+        return np.nan if pos is None else self.high[pos]
+
+    def min(self, start, stop):
+        pos = self.argmin(start, stop)
+        return np.nan if pos is None else self.low[pos]
+
+    def high_in(self, start, stop):
+        pos = self.argmax(start, stop)
+        return (np.nan, None) if pos is None else (self.high[pos], self.dates[pos])
+
+    def low_in(self, start, stop):
+        pos = self.argmin(start, stop)
+        return (np.nan, None) if pos is None else (self.low[pos], self.dates[pos])
+
+    # ------------------------------
+    # rolling-window questions
+    # ------------------------------
+    def rolling_max(self, pos, window):
+        # High.rolling(window).max() at bar pos (NaN before a full window)
+        return np.nan if pos < window - 1 else self.max(pos - window + 1, pos + 1)
+
+    def rolling_min(self, pos, window):
+        return np.nan if pos < window - 1 else self.min(pos - window + 1, pos + 1)
+
+    def last_low_touch(self, window=20):
+        # latest bar whose Low equals its own rolling(window) low; walks back
+        # from the last bar with one O(1) window query per step
+        for pos in range(len(self) - 1, window - 2, -1):
+            if self.low[pos] == self.rolling_min(pos, window):
+                return pos
+        return None
+
+    def first_breakout(self, after, window=20):
+        # first bar after `after` whose High reaches the previous bar's
+        # rolling(window) high (the GTT trigger); walks forward, O(1) per bar
+        for pos in range(max(after + 1, window), len(self)):
+            if self.high[pos] >= self.rolling_max(pos - 1, window):
+                return pos
+        return None
@@ -0,0 +1,156 @@
+import sys
+import pandas as pd
+import pytz
+from datetime import datetime, timedelta
+
+import candle_store
+
+# Failure tracking for instrument fetches, persisted in the local market store.
+#
+# Every empty or failed response bumps an instrument's consecutive-failure count;
+# a success resets it. After QUARANTINE_AFTER failures in a row the instrument is
+# quarantined and only re-probed after 1, 2, 4, ... days (capped), so delisted or
+# renamed symbols in the index CSVs / ETF.csv stop costing a timeout every run.
+
+TIME_ZONE = pytz.timezone('Asia/Kolkata')
+
+QUARANTINE_AFTER = 3
+BASE_PROBE_DAYS = 1
+MAX_PROBE_DAYS = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetch_health (
+    instrument    TEXT PRIMARY KEY,
+    failures      INTEGER NOT NULL DEFAULT 0,
+    total_fail    INTEGER NOT NULL DEFAULT 0,
+    last_kind     TEXT,
+    last_error    TEXT,
+    last_attempt  TEXT,
+    last_success  TEXT,
+    next_probe    TEXT
+);
+"""
+
+
+def _ensure_schema(conn):
+    with candle_store.WRITE_LOCK:
+        conn.executescript(_SCHEMA)
+
+
+def _now():
+    return datetime.now(TIME_ZONE).replace(tzinfo=None)
+
+
+def probe_interval(failures):
+    if failures < QUARANTINE_AFTER:
+        return timedelta(0)
+    return timedelta(days=min(BASE_PROBE_DAYS * 2 ** (failures - QUARANTINE_AFTER), MAX_PROBE_DAYS))
+
+
+# ==============================
+# RECORD
+# ==============================
+def record_success(conn, instrument):
+    _ensure_schema(conn)
+    now = _now().isoformat(timespec='seconds')
+    with candle_store.writing(conn):
+        conn.execute(
+            'INSERT INTO fetch_health (instrument, failures, last_attempt, last_success) VALUES (?, 0, ?, ?) '
+            'ON CONFLICT(instrument) DO UPDATE SET failures = 0, last_kind = NULL, last_error = NULL, '
+            'last_attempt = excluded.last_attempt, last_success = excluded.last_success, next_probe = NULL',
+            (instrument, now, now),
+        )
+
+
+def record_failure(conn, instrument, kind, error=None):
+    # kind: 'empty' (no candles) or 'error' (exception / API error)
+    _ensure_schema(conn)
+    now = _now()
+    row = conn.execute('SELECT failures FROM fetch_health WHERE instrument = ?', (instrument,)).fetchone()
+    failures = (row[0] if row else 0) + 1
+    next_probe = now + probe_interval(failures)
+
+    with candle_store.writing(conn):
+        conn.execute(
+            'INSERT INTO fetch_health (instrument, failures, total_fail, last_kind, last_error, last_attempt, next_probe) '
+            'VALUES (?, ?, 1, ?, ?, ?, ?) '
+            'ON CONFLICT(instrument) DO UPDATE SET failures = excluded.failures, total_fail = total_fail + 1, '
+            'last_kind = excluded.last_kind, last_error = excluded.last_error, '
+            'last_attempt = excluded.last_attempt, next_probe = excluded.next_probe',
+            (instrument, failures, kind, str(error)[:500] if error else None,
+             now.isoformat(timespec='seconds'), next_probe.isoformat(timespec='seconds')),
+        )
+
+    if failures == QUARANTINE_AFTER:
+        print(f"🚫 {instrument} quarantined after {failures} consecutive {kind} responses")
+    return failures
+
+
+# ==============================
+# SCHEDULE
+# ==============================
+def load_health(conn, instruments=None):
+    _ensure_schema(conn)
+    df = pd.read_sql_query('SELECT * FROM fetch_health', conn)
+    if instruments is not None:
+        df = df[df['instrument'].isin(set(instruments))]
+    return df.set_index('instrument')
+
+
+def schedule(conn, instruments, now=None):
+    # Returns (to_fetch, skipped): healthy instruments first, then ones with
+    # recent failures, then quarantined ones that are due for a re-probe.
+    now = now or _now()
+    health = load_health(conn, instruments)
+
+    healthy, flaky, probes, skipped = [], [], [], []
+    for instrument in instruments:
+        if instrument not in health.index:
+            healthy.append(instrument)
+            continue
+        row = health.loc[instrument]
+        failures = row['failures']
+        if failures == 0:
+            healthy.append(instrument)
+        elif failures < QUARANTINE_AFTER:
+            flaky.append(instrument)
+        elif row['next_probe'] and pd.Timestamp(row['next_probe']) <= now:
+            probes.append(instrument)
+        else:
+            skipped.append(instrument)
+
+    return healthy + flaky + probes, skipped
+
+
+def schedule_frame(df, key_column='instrument_key'):
+    # Reorder a symbols frame for fetching and drop quarantined rows not yet due.
+    conn = candle_store.connect()
+    try:
+        order, skipped = schedule(conn, list(df[key_column]))
+    finally:
+        conn.close()
+
+    if skipped:
+        print(f"⏭️ Skipping {len(skipped)} quarantined instrument(s): {', '.join(map(str, skipped[:10]))}{' ...' if len(skipped) > 10 else ''}")
+
+    rank = {k: i for i, k in enumerate(order)}
+    out = df[df[key_column].isin(rank)]
+    return out.iloc[out[key_column].map(rank).argsort()]
+
+
+def main():
+    conn = candle_store.connect()
+    health = load_health(conn)
+    if len(sys.argv) >= 3 and sys.argv[1] == 'reset':
+        with candle_store.writing(conn):
+            conn.executemany('DELETE FROM fetch_health WHERE instrument = ?', [(i,) for i in sys.argv[2:]])
+        print(f"✅ Reset {len(sys.argv) - 2} instrument(s)")
+        return
+    bad = health[health['failures'] > 0].sort_values('failures', ascending=False)
+    print(f"🩺 {len(health)} tracked, {int((health['failures'] >= QUARANTINE_AFTER).sum())} quarantined")
+    if not bad.empty:
+        print(bad[['failures', 'total_fail', 'last_kind', 'last_attempt', 'next_probe', 'last_error']].to_string())
+
+
+if __name__ == "__main__":
+    main()
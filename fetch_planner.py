@@ -0,0 +1,243 @@
+import sys
+import urllib.parse
+import numpy as np
+import pandas as pd
+import requests
+from collections import namedtuple
+
+import candle_store
+import corporate_actions
+import fetch_health
+import trading_calendar
+
+# Turns "I need daily candles from X" into the smallest set of Upstox range
+# requests, using the trading calendar to tell real gaps from holidays.
+#
+#   fetch_coverage  earliest date already requested per instrument, so the
+#                   pre-listing head of a young instrument is asked for once
+#   fetch_empty     sessions inside a fetched range that came back without a
+#                   bar (suspensions), so they are not re-requested every run
+
+UPSTOX_CANDLE_URL = 'https://api.upstox.com/v2/historical-candle/{key}/{interval}/{to_date}/{from_date}'
+
+# Refetching a few stored bars is cheaper than another round trip.
+MERGE_GAP = 5
+
+FetchRequest = namedtuple('FetchRequest', ['instrument', 'from_date', 'to_date'])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetch_coverage (
+    instrument   TEXT PRIMARY KEY,
+    covered_from TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetch_empty (
+    instrument TEXT NOT NULL,
+    date       TEXT NOT NULL,
+    PRIMARY KEY (instrument, date)
+) WITHOUT ROWID;
+"""
+
+
+def _ensure_schema(conn):
+    with candle_store.WRITE_LOCK:
+        conn.executescript(_SCHEMA)
+
+
+def _day(value):
+    return trading_calendar._to_day(value)
+
+
+# ==============================
+# GAP DETECTION
+# ==============================
+def session_gaps(calendar, stored_dates, start, end):
+    expected = calendar.sessions(start, end)
+    stored = pd.DatetimeIndex(stored_dates)
+    if stored.tz is not None:
+        stored = stored.tz_localize(None)
+    return expected[~expected.isin(stored.normalize())]
+
+
+def group_ranges(calendar, missing, start, end, merge_gap=MERGE_GAP):
+    # Consecutive missing sessions (only non-session days between them) form one
+    # range; ranges separated by at most merge_gap stored sessions are merged.
+    if len(missing) == 0:
+        return []
+
+    sessions = calendar.sessions(start, end)
+    pos = sessions.get_indexer(missing)
+    pos = pos[pos >= 0]
+    if len(pos) == 0:
+        return []
+
+    breaks = np.where(np.diff(pos) > merge_gap + 1)[0]
+    starts = np.r_[0, breaks + 1]
+    ends = np.r_[breaks, len(pos) - 1]
+    return [(sessions[pos[s]], sessions[pos[e]]) for s, e in zip(starts, ends)]
+
+
+def overdue_sessions(calendar, stored_dates, end=None):
+    # sessions after the last stored bar that should have been published by
+    # now: every one up to `end` (default: last completed session) but the last
+    end = _day(end) if end is not None else calendar.last_completed_session()
+    stored = pd.DatetimeIndex(stored_dates)
+    if stored.tz is not None:
+        stored = stored.tz_localize(None)
+    if len(stored) == 0:
+        return pd.DatetimeIndex([])
+    return calendar.sessions(stored[-1].normalize() + pd.Timedelta(days=1), end)[:-1]
+
+
+def _covered_from(conn, instrument):
+    row = conn.execute('SELECT covered_from FROM fetch_coverage WHERE instrument = ?', (instrument,)).fetchone()
+    return pd.Timestamp(row[0]) if row else None
+
+
+def _known_empty(conn, instrument):
+    rows = conn.execute('SELECT date FROM fetch_empty WHERE instrument = ?', (instrument,)).fetchall()
+    return pd.to_datetime([r[0] for r in rows])
+
+
+# ==============================
+# PLANNING
+# ==============================
+def plan_instrument(conn, calendar, instrument, start, end=None, merge_gap=MERGE_GAP):
+
+    _ensure_schema(conn)
+    start = _day(start)
+    end = _day(end) if end is not None else calendar.last_completed_session()
+    if start > end:
+        return []
+
+    stored = candle_store.candle_dates(conn, instrument)
+    covered_from = _covered_from(conn, instrument)
+
+    if len(stored) == 0:
+        # nothing stored: backfill the whole requested range (instruments that
+        # keep coming back empty are quarantined by fetch_health)
+        sessions = calendar.sessions(start, end)
+        return [FetchRequest(instrument, sessions[0], sessions[-1])] if len(sessions) else []
+
+    known = stored.union(_known_empty(conn, instrument))
+    first = stored[0]
+    missing = session_gaps(calendar, known, max(start, first), end)
+    ranges = group_ranges(calendar, missing, start, end, merge_gap)
+
+    head_limit = first if covered_from is None else min(first, covered_from)
+    if start < head_limit:
+        head = calendar.sessions(start, head_limit - pd.Timedelta(days=1))
+        if len(head):
+            if ranges and calendar.sessions(head[-1], ranges[0][0]).size - 2 <= merge_gap:
+                ranges[0] = (head[0], ranges[0][1])
+            else:
+                ranges.insert(0, (head[0], head[-1]))
+
+    return [FetchRequest(instrument, f, t) for f, t in ranges]
+
+
+def plan(conn, instruments, start, end=None, calendar=None, merge_gap=MERGE_GAP):
+    calendar = calendar or trading_calendar.TradingCalendar.from_local(conn)
+    requests_ = []
+    for instrument in instruments:
+        requests_.extend(plan_instrument(conn, calendar, instrument, start, end, merge_gap))
+    return requests_
+
+
+# ==============================
+# FETCH
+# ==============================
+def candles_to_frame(candles):
+    df = pd.DataFrame(candles)
+    df.columns = ['date', 'Open', 'High', 'Low', 'Close', 'Volume', 'OI']
+    df['date'] = pd.to_datetime(df['date'])
+    df.set_index('date', inplace=True)
+    df.sort_index(inplace=True)
+    return df
+
+
+def fetch_range(instrument, from_date, to_date, interval='day', timeout=5.0):
+    url = UPSTOX_CANDLE_URL.format(
+        key=urllib.parse.quote(instrument),
+        interval=interval,
+        to_date=pd.Timestamp(to_date).strftime('%Y-%m-%d'),
+        from_date=pd.Timestamp(from_date).strftime('%Y-%m-%d'),
+    )
+    res = requests.get(url, headers={'accept': 'application/json'}, timeout=timeout)
+    data = res.json()
+    if 'data' not in data:
+        raise ValueError(f"Upstox error for {instrument}: {data.get('errors') or data}")
+    candles = data['data'].get('candles') or []
+    return candles_to_frame(candles) if candles else pd.DataFrame(columns=candle_store.CANDLE_COLUMNS)
+
+
+def execute(conn, calendar, request):
+    df = fetch_range(request.instrument, request.from_date, request.to_date)
+    candle_store.save_candles(conn, request.instrument, df)
+
+    got = pd.DatetimeIndex(df.index)
+    if got.tz is not None:
+        got = got.tz_localize(None)
+
+    with candle_store.writing(conn):
+        covered = _covered_from(conn, request.instrument)
+        if covered is None or request.from_date < covered:
+            conn.execute('INSERT OR REPLACE INTO fetch_coverage VALUES (?, ?)', (request.instrument, request.from_date.strftime('%Y-%m-%d')))
+
+        stored = candle_store.candle_dates(conn, request.instrument)
+        if len(stored):
+            # Requested sessions still empty between the instrument's first and
+            # last stored bar are real non-trading days for it (suspensions).
+            # Anything after the last stored bar may simply not be published yet.
+            empty = session_gaps(calendar, got, request.from_date, request.to_date)
+            empty = empty[(empty > stored[0]) & (empty < stored[-1])]
+            conn.executemany('INSERT OR IGNORE INTO fetch_empty VALUES (?, ?)', [(request.instrument, d.strftime('%Y-%m-%d')) for d in empty])
+    return len(df)
+
+
+def sync_daily_candles(instrument, start, end=None):
+    # Bring the store up to date for one instrument, then return the adjusted
+    # candles from start onwards (what the fetchers used to download in full).
+    # Outcomes feed fetch_health so dead instruments get quarantined.
+    conn = candle_store.connect()
+    try:
+        _ensure_schema(conn)
+        calendar = trading_calendar.default_calendar()
+        planned = plan_instrument(conn, calendar, instrument, start, end)
+
+        fetched = 0
+        try:
+            for request in planned:
+                fetched += execute(conn, calendar, request)
+        except Exception as e:
+            fetch_health.record_failure(conn, instrument, 'error', e)
+            raise
+
+        df = corporate_actions.load_adjusted_candles(conn, instrument, start=start)
+        stored = candle_store.candle_dates(conn, instrument)
+        if len(stored) == 0:
+            fetch_health.record_failure(conn, instrument, 'empty')
+        elif fetched or not planned:
+            fetch_health.record_success(conn, instrument)
+        elif len(overdue_sessions(calendar, stored, end)):
+            # still nothing for sessions before the latest one: delisted,
+            # renamed or suspended - repeats get the instrument quarantined
+            fetch_health.record_failure(conn, instrument, 'empty')
+        # else: only the latest session is missing (not published yet, no
+        # trade that day) - neither success nor failure
+        return df
+    finally:
+        conn.close()
+
+
+def main():
+    conn = candle_store.connect()
+    start = sys.argv[1] if len(sys.argv) > 1 else '2024-10-01'
+    instruments = sys.argv[2:] or candle_store.list_instruments(conn)
+    planned = plan(conn, instruments, start)
+    print(f"🗓️ {len(planned)} request(s) for {len(instruments)} instrument(s) since {start}")
+    for r in planned:
+        print(f"   {r.instrument}: {r.from_date:%Y-%m-%d} -> {r.to_date:%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    main()
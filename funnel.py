@@ -0,0 +1,205 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+import indicators
+import results_sink
+import rule_engine
+import streaming_scan
+import trading_calendar
+
+# Two-stage screening funnel.
+#
+# Stage 1 screens the whole universe from today's bhavcopy row (CLOSE_PRICE,
+# HIGH_PRICE, LOW_PRICE) against yesterday's indicator table (20D high/low,
+# 124DMA, RSI). Only candidates near a trigger threshold go to stage 2, which
+# fetches full history and recomputes their rows. Everyone else keeps the
+# stored row with price fields refreshed from the bhavcopy.
+#
+# A stock is a candidate if
+#   * it is not in the stored table, or its levels were last computed from full
+#     history MAX_STALE_SESSIONS ago (LEVELS_DATE; stored 20D / DMA values
+#     drift as bars roll out of the window)
+#   * today's high is within MARGIN_PCT of the 20D high (GTT trigger / update)
+#   * today's low is within MARGIN_PCT of the 20D low (new 20D low, NEW ADD)
+#   * its ratio or RSI is near the observation or exit threshold of any SRT
+#     strategy whose ledger is gated here (zones from rule_engine.STRATEGIES)
+#   * it has an open position in the latest SRT ledger (stop-loss / exit)
+
+MARGIN_PCT = 2.0
+RSI_BAND = 5.0
+MAX_STALE_SESSIONS = 5
+
+# ledgers checked for open positions; each is also a rule_engine strategy
+SRT_OUTPUTS = ['SRT-N200', 'SRT-ETF', 'SRT-N500-YF', 'SRT-N100-YF']
+
+
+# ==============================
+# STAGE 1: SNAPSHOT PREFILTER
+# ==============================
+def bhavcopy_snapshot(path, series='EQ'):
+    df = streaming_scan.read_bhavcopy(path)
+    df = df[df['SERIES'] == series].drop_duplicates(subset='Symbol').set_index('Symbol')
+    snap = pd.DataFrame({
+        'DATE': pd.to_datetime(df['DATE1'], format='%d-%b-%Y'),
+        'PREV_CLOSE': pd.to_numeric(df['PREV_CLOSE'], errors='coerce'),
+        'HIGH': pd.to_numeric(df['HIGH_PRICE'], errors='coerce'),
+        'LOW': pd.to_numeric(df['LOW_PRICE'], errors='coerce'),
+        'CLOSE': pd.to_numeric(df['CLOSE_PRICE'], errors='coerce'),
+    })
+    snap.index.name = 'SYMBOL'
+    return snap
+
+
+def open_positions(outputs=SRT_OUTPUTS):
+    conn = results_sink.connect()
+    try:
+        held = set()
+        for output in outputs:
+            ledger = results_sink.read_output(conn, output)
+            if ledger.empty:
+                continue
+            ledger = ledger[(ledger['run_id'] == ledger['run_id'].max()) & ledger['Action'].isin(['Buy', 'Sell'])]
+            last = ledger.groupby('Stock')['Action'].last()
+            held.update(last[last == 'Buy'].index)
+        return held
+    finally:
+        conn.close()
+
+
+def _near(value, op, threshold, slack):
+    # the comparison widened by slack, so bars about to cross it are fetched too
+    return value < threshold + slack if op in ('<', '<=') else value > threshold - slack
+
+
+def srt_zones(values, margin, rsi_band, strategies=SRT_OUTPUTS):
+    # values: {'RATIO': ..., 'RSI': ...} -> (entry zone, exit zone) over all strategies:
+    # every observe threshold near (they are ANDed), or any exit threshold near
+    entry = exit_ = False
+    for strategy in strategies:
+        rules = rule_engine.STRATEGIES[strategy]
+        for rule, combine in (('observe', np.logical_and), ('exit', np.logical_or)):
+            hits = [_near(values[field], op, threshold, threshold * margin if field == 'RATIO' else rsi_band)
+                    for field, op, threshold in rule_engine.thresholds(rules[rule]) if field in values]
+            if not hits:
+                continue
+            zone = combine.reduce(hits)
+            if rule == 'observe':
+                entry = entry | zone
+            else:
+                exit_ = exit_ | zone
+    return entry, exit_
+
+
+def candidates(snap, table, calendar=None, margin_pct=MARGIN_PCT, rsi_band=RSI_BAND,
+               max_stale=MAX_STALE_SESSIONS, held=(), strategies=SRT_OUTPUTS):
+
+    calendar = calendar or trading_calendar.default_calendar()
+    margin = margin_pct / 100
+    state = table.reindex(snap.index)
+
+    # sessions between the stored row and the snapshot, one vectorized lookup
+    stored_date = pd.to_datetime(state['LEVELS_DATE'] if 'LEVELS_DATE' in state else state['DATE'])
+    missing = stored_date.isna().to_numpy()
+    stored_date = stored_date.fillna(snap['DATE'])
+    sessions = calendar.sessions(stored_date.min(), snap['DATE'].max())
+    age = sessions.searchsorted(snap['DATE'].to_numpy()) - sessions.searchsorted(stored_date.to_numpy())
+    age = np.where(missing, max_stale, age)
+
+    ratio = snap['CLOSE'] / state['DMA_124']
+    entry_zone, exit_zone = srt_zones({'RATIO': ratio, 'RSI': state['RSI_D']}, margin, rsi_band, strategies)
+
+    reasons = pd.DataFrame({
+        'NEW_OR_STALE': age >= max_stale,
+        'NEAR_20D_HIGH': snap['HIGH'] >= state['HIGH_20D'] * (1 - margin),
+        'NEAR_20D_LOW': snap['LOW'] <= state['LOW_20D'] * (1 + margin),
+        'SRT_ENTRY_ZONE': entry_zone,
+        'SRT_EXIT_ZONE': exit_zone,
+        'OPEN_POSITION': snap.index.isin(list(held)),
+    }, index=snap.index)
+    return reasons
+
+
+# ==============================
+# STAGE 2: FULL HISTORY FOR CANDIDATES
+# ==============================
+def refresh_snapshot_rows(rows, snap):
+    # Rows that skipped stage 2: stored levels, today's prices.
+    rows = rows.copy()
+    today = snap.reindex(rows.index)
+    if 'LEVELS_DATE' not in rows:
+        rows['LEVELS_DATE'] = rows['DATE']
+    rows['DATE'] = today['DATE']
+    rows['CLOSE'] = today['CLOSE']
+    rows['CHANGE_PCT'] = (today['CLOSE'] - today['PREV_CLOSE']) / today['PREV_CLOSE'] * 100
+    rows['RATIO'] = today['CLOSE'] / rows['DMA_124']
+    pending = ~rows['TRIGGERED'].astype(bool)
+    rows.loc[pending, 'DIFF_PCT'] = (rows['NEW_GTT'] - rows['CLOSE']) / rows['CLOSE'] * 100
+    return rows
+
+
+def run_funnel(snap, table, fetch, held=(), **thresholds):
+    # fetch(symbols) -> {symbol: history}
+    reasons = candidates(snap, table, held=held, **thresholds)
+    picked = reasons.index[reasons.any(axis=1)]
+
+    histories = fetch(list(picked)) if len(picked) else {}
+    fresh = indicators.build_indicator_table(histories)
+    fresh['LEVELS_DATE'] = fresh['DATE'] if len(fresh) else None
+    fresh['FUNNEL'] = 'full'
+
+    kept = table.index.intersection(snap.index).difference(fresh.index)
+    stored = refresh_snapshot_rows(table.loc[kept], snap)
+    stored['FUNNEL'] = 'snapshot'
+
+    out = pd.concat([fresh, stored]).sort_index()
+    out.index.name = 'SYMBOL'
+    return out, reasons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot prefilter, then full history only for candidates")
+    parser.add_argument('--bhavcopy', help='bhavcopy CSV (default: latest sec_bhavdata_full_*.csv)')
+    parser.add_argument('lists', nargs='*', help='restrict the universe to these index list CSVs')
+    parser.add_argument('--table', default=indicators.INDICATOR_TABLE_PATH, help='stored indicator table (stage 1 state)')
+    parser.add_argument('--margin-pct', type=float, default=MARGIN_PCT)
+    parser.add_argument('--rsi-band', type=float, default=RSI_BAND)
+    parser.add_argument('--max-stale', type=int, default=MAX_STALE_SESSIONS)
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--dry-run', action='store_true', help='only report the candidates')
+    args = parser.parse_args()
+
+    path = args.bhavcopy or streaming_scan.latest_bhavcopy()
+    if not path:
+        print("⚠️ No bhavcopy file found")
+        return
+    snap = bhavcopy_snapshot(path)
+    if args.lists:
+        universe = pd.concat([pd.read_csv(p)['Symbol'].str.strip() for p in args.lists]).unique()
+        snap = snap[snap.index.isin(universe)]
+
+    try:
+        table = indicators.load_indicator_table(args.table)
+    except FileNotFoundError:
+        print(f"⚠️ No stored indicator table at {args.table}; every symbol is a candidate")
+        table = pd.DataFrame(columns=['DATE', 'HIGH_20D', 'LOW_20D', 'DMA_124', 'RSI_D', 'NEW_GTT', 'TRIGGERED', 'GTT_UPDATE'])
+
+    held = open_positions()
+    thresholds = {'margin_pct': args.margin_pct, 'rsi_band': args.rsi_band, 'max_stale': args.max_stale}
+
+    if args.dry_run:
+        reasons = candidates(snap, table, held=held, **thresholds)
+        picked = reasons.any(axis=1)
+        print(f"🔍 {int(picked.sum())} of {len(snap)} symbols need full history")
+        print(reasons[picked].sum().to_string())
+        return
+
+    fetch = lambda symbols: indicators.download_histories(symbols, years=args.years)
+    out, reasons = run_funnel(snap, table, fetch, held=held, **thresholds)
+    n_full = int((out['FUNNEL'] == 'full').sum())
+    print(f"✅ {n_full} of {len(out)} symbols fetched in full ({n_full / max(len(out), 1) * 100:.1f}%)")
+    indicators.save_indicator_table(out, args.table)
+
+
+if __name__ == "__main__":
+    main()
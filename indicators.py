@@ -0,0 +1,272 @@
+import os
+import argparse
+import hashlib
+import numpy as np
+import pandas as pd
+import ta
+from datetime import datetime, timedelta
+
+import candle_store
+import extrema_index
+import price_panel
+import trading_calendar
+
+# Shared indicator table: one row per symbol with the latest SST / SRT fields.
+# Column names are plain identifiers so screen expressions can refer to them
+# directly, e.g. "RSI_D < 30 and ADX_D > 25 and CLOSE > 0.95 * NEW_GTT".
+
+INDICATOR_TABLE_PATH = os.path.join(candle_store.DATA_DIR, 'indicator_table.csv')
+INDICATOR_CACHE_DIR = os.path.join(candle_store.DATA_DIR, 'indicators')
+
+SRT_DMA = 124
+
+
+# ==============================
+# PER-BAR INDICATORS
+# ==============================
+def compute_indicators(df):
+
+    df = df.sort_index()
+
+    out = pd.DataFrame(index=df.index)
+    out['OPEN'] = df['Open']
+    out['HIGH'] = df['High']
+    out['LOW'] = df['Low']
+    out['CLOSE'] = df['Close']
+
+    out['LOW_20D'] = df['Low'].rolling(window=20).min()
+    out['HIGH_20D'] = df['High'].rolling(window=20).max()
+    out['PREV_HIGH_20D'] = out['HIGH_20D'].shift(1)
+
+    out['DMA_124'] = df['Close'].rolling(window=SRT_DMA).mean()
+    out['RATIO'] = df['Close'] / out['DMA_124']
+
+    out['RSI_D'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
+    if len(df) > 28:
+        out['ADX_D'] = ta.trend.ADXIndicator(high=df['High'], low=df['Low'], close=df['Close'], window=14).adx()
+    else:
+        out['ADX_D'] = float('nan')
+
+    return out
+
+
+# ==============================
+# PER-INSTRUMENT CACHE
+# ==============================
+def _cache_path(instrument):
+    safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in instrument)
+    return os.path.join(INDICATOR_CACHE_DIR, f"{safe}.pkl")
+
+
+def history_fingerprint(df):
+    # every bar's date and OHLC, so a back-adjusted history (corporate action,
+    # corrected candle) misses the cache even if invalidate() never ran
+    h = hashlib.sha1(np.ascontiguousarray(pd.DatetimeIndex(df.index).tz_localize(None).asi8).tobytes())
+    h.update(np.ascontiguousarray(df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+def cached_indicators(instrument, df):
+
+    path = _cache_path(instrument)
+    df = df.sort_index()
+    fingerprint = history_fingerprint(df)
+
+    if os.path.exists(path):
+        try:
+            cached = pd.read_pickle(path)
+            if isinstance(cached, dict) and cached.get('history') == fingerprint:
+                return cached['indicators']
+        except Exception as e:
+            print(f"Discarding indicator cache for {instrument}: {e}")
+
+    ind = compute_indicators(df)
+    os.makedirs(INDICATOR_CACHE_DIR, exist_ok=True)
+    pd.to_pickle({'history': fingerprint, 'indicators': ind}, path)
+    return ind
+
+
+def invalidate(instrument):
+    path = _cache_path(instrument)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _last_rsi(close, rule):
+    resampled = close.resample(rule).last().dropna()
+    if len(resampled) < 15:
+        return None
+    return ta.momentum.RSIIndicator(resampled, window=14).rsi().iloc[-1]
+
+
+def _nan(value):
+    return float('nan') if value is None else value
+
+
+def _naive(ts):
+    if ts is None:
+        return pd.NaT
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+# ==============================
+# LATEST-ROW SUMMARY (same rules as screeneryfinance.process_stocks)
+# ==============================
+def summarize(df, as_of=None, instrument=None):
+
+    ind = cached_indicators(instrument, df) if instrument else compute_indicators(df)
+    if ind.empty:
+        return None
+
+    as_of = as_of or datetime.today()
+    dates = ind.index
+
+    close = ind['CLOSE'].iloc[-1]
+    prev_close = ind['CLOSE'].iloc[-2] if len(ind) >= 2 else None
+    change_pct = ((close - prev_close) / prev_close) * 100 if prev_close else None
+
+    # window extremes come from the range index, not mask scans over the columns
+    idx = extrema_index.ExtremaIndex(ind['HIGH'], ind['LOW'], dates)
+    last = len(ind) - 1
+
+    old_gtt = idx.rolling_max(last - 1, 20)
+    new_gtt = idx.rolling_max(last, 20)
+
+    low_pos = idx.last_low_touch(20)
+    low_20d_date = dates[low_pos] if low_pos is not None else None
+    low_20d = idx.low[low_pos] if low_pos is not None else None
+
+    start, stop = idx.since(pd.Timestamp(as_of - timedelta(days=365)).tz_localize(dates.tz))
+    high_52w = idx.max(start, stop)
+    low_52w = idx.min(start, stop)
+    boh = start < stop and idx.argmin(start, stop) > idx.argmax(start, stop)
+
+    trigger_date = None
+    trigger_price = None
+    if low_pos is not None:
+        hit = idx.first_breakout(low_pos, 20)
+        if hit is not None:
+            trigger_date = dates[hit]
+            trigger_price = idx.rolling_max(hit - 1, 20)
+
+    pnl_pct = ((close - trigger_price) / trigger_price) * 100 if trigger_price else None
+    diff_pct = ((new_gtt - close) / close) * 100 if trigger_date is None and new_gtt and close else None
+
+    if trigger_date is not None:
+        gtt_update = "TRIGGERED"
+    elif old_gtt != new_gtt:
+        gtt_update = "YES"
+    elif low_20d_date is not None and low_20d_date.date() == trading_calendar.default_calendar().last_session(as_of).date():
+        gtt_update = "NEW ADD"
+    else:
+        gtt_update = ""
+
+    return {
+        'DATE': _naive(dates[-1]),
+        'CLOSE': close,
+        'CHANGE_PCT': _nan(change_pct),
+        'LOW_20D_DATE': _naive(low_20d_date),
+        'LOW_20D': _nan(low_20d),
+        'HIGH_20D': ind['HIGH_20D'].iloc[-1],
+        'OLD_GTT': old_gtt,
+        'NEW_GTT': new_gtt,
+        'DIFF_PCT': _nan(diff_pct),
+        'GTT_UPDATE': gtt_update,
+        'TRIGGERED': trigger_date is not None,
+        'TRIGGER_DATE': _naive(trigger_date),
+        'GTT_TRIGGER_PRICE': _nan(trigger_price),
+        'PNL_PCT': _nan(pnl_pct),
+        'HIGH_52W': high_52w,
+        'LOW_52W': low_52w,
+        'BOH': boh,
+        'DMA_124': ind['DMA_124'].iloc[-1],
+        'RATIO': ind['RATIO'].iloc[-1],
+        'RSI_D': ind['RSI_D'].iloc[-1],
+        'RSI_W': _nan(_last_rsi(ind['CLOSE'], 'W')),
+        'RSI_M': _nan(_last_rsi(ind['CLOSE'], 'ME')),
+        'ADX_D': ind['ADX_D'].iloc[-1],
+    }
+
+
+# ==============================
+# UNIVERSE TABLE
+# ==============================
+def build_indicator_table(histories, as_of=None):
+
+    rows = {}
+    for symbol, df in histories.items():
+        try:
+            if df is None or df.empty:
+                continue
+            row = summarize(df, as_of=as_of)
+            if row:
+                rows[symbol] = row
+        except Exception as e:
+            print(f"Error computing indicators for {symbol}: {e}")
+
+    table = pd.DataFrame.from_dict(rows, orient='index')
+    table.index.name = 'SYMBOL'
+    return table
+
+
+def save_indicator_table(table, path=INDICATOR_TABLE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    table.to_csv(path)
+
+
+def load_indicator_table(path=INDICATOR_TABLE_PATH):
+    table = pd.read_csv(path, index_col='SYMBOL', parse_dates=['DATE', 'LOW_20D_DATE', 'TRIGGER_DATE'])
+    table['GTT_UPDATE'] = table['GTT_UPDATE'].fillna('')
+    return table
+
+
+# ==============================
+# FETCH (yfinance, one download for the whole universe)
+# ==============================
+def download_histories(symbols, years=5):
+    import yfinance as yf
+
+    end_date = datetime.today()
+    start_date = end_date - timedelta(days=years * 365)
+    tickers = [s + ".NS" for s in symbols]
+    hist = yf.download(tickers, start=start_date, end=end_date + timedelta(days=1), group_by='ticker', auto_adjust=False)
+
+    histories = {}
+    for symbol, ticker in zip(symbols, tickers):
+        try:
+            histories[symbol] = hist[ticker].dropna(how='all')
+        except KeyError:
+            print(f"No data for {ticker}")
+    return histories
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the universe indicator table")
+    parser.add_argument('lists', nargs='*', default=['ind_nifty200list.csv'], help='index list CSVs with a Symbol column')
+    parser.add_argument('--from-panel', action='store_true', help='use a stored price panel instead of downloading')
+    parser.add_argument('--panel', default=price_panel.PANEL_DIR,
+                        help=f'panel for --from-panel (default: the candle-store panel; the yfinance one is {price_panel.YF_PANEL_DIR})')
+    args = parser.parse_args()
+
+    if args.from_panel:
+        panel = price_panel.open_panel(args.panel)
+        if panel is None:
+            print(f"⚠️ No panel at {args.panel}")
+            return
+        histories = dict(panel.histories())
+    else:
+        symbols = []
+        for path in args.lists:
+            for s in pd.read_csv(path)['Symbol'].str.strip().str.upper():
+                if s not in symbols:
+                    symbols.append(s)
+        histories = download_histories(symbols)
+        price_panel.write_panel(histories, price_panel.YF_PANEL_DIR)
+
+    table = build_indicator_table(histories)
+    save_indicator_table(table)
+    print(f"✅ Indicator table saved: {len(table)} symbols -> {INDICATOR_TABLE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
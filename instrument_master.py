@@ -0,0 +1,83 @@
+import sys
+import pandas as pd
+import pytz
+from datetime import datetime
+
+import candle_store
+
+# Local copy of the Upstox instrument master (NSE_EQ rows), kept in market.db.
+# The 30 MB complete.csv.gz is downloaded at most once per day; later runs that
+# day (and runners restored from a snapshot) read the stored copy, and a failed
+# download falls back to whatever copy is stored.
+
+MASTER_URL = 'https://assets.upstox.com/market-quote/instruments/exchange/complete.csv.gz'
+
+TIME_ZONE = pytz.timezone('Asia/Kolkata')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instrument_master_meta (
+    exchange   TEXT PRIMARY KEY,
+    fetched_on TEXT NOT NULL,
+    rows       INTEGER NOT NULL
+);
+"""
+
+
+def _ensure_schema(conn):
+    with candle_store.WRITE_LOCK:
+        conn.executescript(_SCHEMA)
+
+
+def _table(exchange):
+    return 'instrument_master_' + exchange.lower()
+
+
+def _today():
+    return datetime.now(TIME_ZONE).strftime('%Y-%m-%d')
+
+
+def fetched_on(conn, exchange='NSE_EQ'):
+    _ensure_schema(conn)
+    row = conn.execute('SELECT fetched_on FROM instrument_master_meta WHERE exchange = ?', (exchange,)).fetchone()
+    return row[0] if row else None
+
+
+def save_master(conn, df, exchange='NSE_EQ'):
+    _ensure_schema(conn)
+    df = df[df.exchange == exchange]
+    with candle_store.writing(conn):
+        df.to_sql(_table(exchange), conn, if_exists='replace', index=False)
+        conn.execute('INSERT OR REPLACE INTO instrument_master_meta VALUES (?, ?, ?)', (exchange, _today(), len(df)))
+    return df
+
+
+def stored_master(conn, exchange='NSE_EQ'):
+    if fetched_on(conn, exchange) is None:
+        return None
+    return pd.read_sql_query(f'SELECT * FROM "{_table(exchange)}"', conn)
+
+
+def load_master(exchange='NSE_EQ', refresh=False):
+    conn = candle_store.connect()
+    try:
+        if not refresh and fetched_on(conn, exchange) == _today():
+            return stored_master(conn, exchange)
+        try:
+            return save_master(conn, pd.read_csv(MASTER_URL), exchange).reset_index(drop=True)
+        except Exception as e:
+            stored = stored_master(conn, exchange)
+            if stored is None:
+                raise
+            print(f"⚠️ Instrument master download failed ({e}); using copy from {fetched_on(conn, exchange)}")
+            return stored
+    finally:
+        conn.close()
+
+
+def main():
+    df = load_master(refresh='refresh' in sys.argv[1:])
+    print(f"✅ {len(df)} NSE_EQ instruments")
+
+
+if __name__ == "__main__":
+    main()
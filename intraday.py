@@ -0,0 +1,351 @@
+import os
+import glob
+import argparse
+import urllib.parse
+import numpy as np
+import pandas as pd
+import requests
+from datetime import datetime, timedelta
+
+import candle_store
+import fetch_planner
+import indicators
+import screen_expr
+
+# Intraday screening on Upstox minute candles.
+#
+# 1-minute bars live in data/intraday/<instrument>/<YYYY-MM>.npz (compressed):
+#   t        int32  minutes since 1970-01-01 on the IST wall clock
+#   o h l c  int32  prices in paise
+#   v        int64  volume
+# A sync only rewrites the months it touched. 5/15/30/60-minute bars are
+# derived from the minute bars into <instrument>/<N>min.npz; an update only
+# re-aggregates from the last (possibly partial) derived bar onwards.
+# The screen table has the same columns as the daily indicator table where
+# they make sense, so screens.txt expressions run unchanged on any timeframe;
+# on an intraday table the _D / _20D columns are per bar of that timeframe.
+
+INTRADAY_DIR = os.path.join(candle_store.DATA_DIR, 'intraday')
+
+UPSTOX_MINUTE_URL = 'https://api.upstox.com/v3/historical-candle/{key}/minutes/1/{to_date}/{from_date}'
+UPSTOX_TODAY_URL = 'https://api.upstox.com/v3/historical-candle/intraday/{key}/minutes/1'
+
+TIMEFRAMES = [1, 5, 15, 30, 60]
+PRICE_SCALE = 100
+SESSION_OPEN = 9 * 60 + 15
+MAX_REQUEST_DAYS = 28
+SCREEN_BARS = 600
+
+_FIELDS = ['t', 'o', 'h', 'l', 'c', 'v']
+_EMPTY = {
+    't': np.empty(0, np.int32),
+    'o': np.empty(0, np.int32),
+    'h': np.empty(0, np.int32),
+    'l': np.empty(0, np.int32),
+    'c': np.empty(0, np.int32),
+    'v': np.empty(0, np.int64),
+}
+
+
+def _dir(instrument):
+    safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in instrument)
+    return os.path.join(INTRADAY_DIR, safe)
+
+
+def _month(minute):
+    return pd.Timestamp(int(minute), unit='m').strftime('%Y-%m')
+
+
+def _to_minutes(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert('Asia/Kolkata').tz_localize(None)
+    return index.values.astype('datetime64[m]').astype(np.int64).astype(np.int32)
+
+
+# ==============================
+# MINUTE STORE
+# ==============================
+def _save(path, bars):
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(tmp, **bars)
+    os.replace(tmp, path)
+
+
+def _load(path):
+    with np.load(path) as f:
+        return {k: f[k] for k in _FIELDS}
+
+
+def _concat(parts):
+    parts = [p for p in parts if len(p['t'])]
+    if not parts:
+        return {k: v.copy() for k, v in _EMPTY.items()}
+    return {k: np.concatenate([p[k] for p in parts]) for k in _FIELDS}
+
+
+def _slice(bars, mask):
+    return {k: v[mask] for k, v in bars.items()}
+
+
+def frame_to_bars(df):
+    df = df.sort_index()
+    df = df[~df.index.duplicated(keep='last')]
+    return {
+        't': _to_minutes(df.index),
+        'o': np.round(df['Open'].to_numpy(float) * PRICE_SCALE).astype(np.int32),
+        'h': np.round(df['High'].to_numpy(float) * PRICE_SCALE).astype(np.int32),
+        'l': np.round(df['Low'].to_numpy(float) * PRICE_SCALE).astype(np.int32),
+        'c': np.round(df['Close'].to_numpy(float) * PRICE_SCALE).astype(np.int32),
+        'v': df['Volume'].fillna(0).to_numpy().astype(np.int64),
+    }
+
+
+def bars_to_frame(bars):
+    df = pd.DataFrame({
+        'Open': bars['o'] / PRICE_SCALE,
+        'High': bars['h'] / PRICE_SCALE,
+        'Low': bars['l'] / PRICE_SCALE,
+        'Close': bars['c'] / PRICE_SCALE,
+        'Volume': bars['v'],
+    }, index=pd.to_datetime(bars['t'].astype(np.int64), unit='m'))
+    df.index.name = 'date'
+    return df
+
+
+def month_files(instrument):
+    return sorted(glob.glob(os.path.join(_dir(instrument), '[0-9][0-9][0-9][0-9]-[0-9][0-9].npz')))
+
+
+def load_minutes(instrument, since=None):
+    # since: minute number; months entirely before it are not read
+    files = month_files(instrument)
+    if since is not None:
+        first = _month(since)
+        files = [f for f in files if os.path.basename(f)[:7] >= first]
+    bars = _concat([_load(f) for f in files])
+    if since is not None:
+        bars = _slice(bars, bars['t'] >= since)
+    return bars
+
+
+def last_minute(instrument):
+    files = month_files(instrument)
+    if not files:
+        return None
+    t = _load(files[-1])['t']
+    return int(t[-1]) if len(t) else None
+
+
+def save_minutes(instrument, new):
+    # merge new minute bars into the month files they fall in
+    if not len(new['t']):
+        return 0
+    os.makedirs(_dir(instrument), exist_ok=True)
+    months = np.array([_month(t) for t in new['t'][[0, -1]]])
+    touched = pd.period_range(months[0], months[-1], freq='M').strftime('%Y-%m')
+
+    new_months = pd.to_datetime(new['t'].astype(np.int64), unit='m').strftime('%Y-%m').to_numpy()
+    for month in touched:
+        part = _slice(new, new_months == month)
+        if not len(part['t']):
+            continue
+        path = os.path.join(_dir(instrument), f"{month}.npz")
+        if os.path.exists(path):
+            old = _load(path)
+            old = _slice(old, ~np.isin(old['t'], part['t']))
+            part = _concat([old, part])
+            order = np.argsort(part['t'], kind='stable')
+            part = {k: v[order] for k, v in part.items()}
+        _save(path, part)
+    return len(new['t'])
+
+
+# ==============================
+# FETCH
+# ==============================
+def _get(url, timeout):
+    res = requests.get(url, headers={'accept': 'application/json'}, timeout=timeout)
+    data = res.json()
+    if 'data' not in data:
+        raise ValueError(f"Upstox error: {data.get('errors') or data}")
+    candles = data['data'].get('candles') or []
+    return fetch_planner.candles_to_frame(candles) if candles else None
+
+
+def fetch_minutes(instrument, from_date, to_date, timeout=10.0):
+    key = urllib.parse.quote(instrument)
+    frames = []
+    start = pd.Timestamp(from_date).normalize()
+    end = pd.Timestamp(to_date).normalize()
+    while start <= end:
+        stop = min(start + timedelta(days=MAX_REQUEST_DAYS - 1), end)
+        url = UPSTOX_MINUTE_URL.format(key=key, to_date=stop.strftime('%Y-%m-%d'), from_date=start.strftime('%Y-%m-%d'))
+        frames.append(_get(url, timeout))
+        start = stop + timedelta(days=1)
+    if end >= pd.Timestamp(datetime.today()).normalize():
+        frames.append(_get(UPSTOX_TODAY_URL.format(key=key), timeout))
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        return _concat([])
+    return frame_to_bars(pd.concat(frames))
+
+
+def sync_minutes(instrument, days=30, timeout=10.0):
+    # Fetch from the day of the last stored minute (it may have been partial).
+    last = last_minute(instrument)
+    today = pd.Timestamp(datetime.today()).normalize()
+    start = pd.Timestamp(last, unit='m').normalize() if last is not None else today - timedelta(days=days)
+    return save_minutes(instrument, fetch_minutes(instrument, start, today, timeout))
+
+
+# ==============================
+# DERIVED TIMEFRAMES
+# ==============================
+def bucket_starts(t, minutes):
+    day = t - t % 1440
+    offset = np.maximum(t % 1440 - SESSION_OPEN, 0)
+    return (day + SESSION_OPEN + offset // minutes * minutes).astype(np.int32)
+
+
+def aggregate(bars, minutes):
+    if minutes == 1 or not len(bars['t']):
+        return bars
+    keys = bucket_starts(bars['t'], minutes)
+    starts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+    ends = np.r_[starts[1:], len(keys)] - 1
+    return {
+        't': keys[starts],
+        'o': bars['o'][starts],
+        'h': np.maximum.reduceat(bars['h'], starts),
+        'l': np.minimum.reduceat(bars['l'], starts),
+        'c': bars['c'][ends],
+        'v': np.add.reduceat(bars['v'], starts),
+    }
+
+
+def _derived_path(instrument, minutes):
+    return os.path.join(_dir(instrument), f"{minutes}min.npz")
+
+
+def derive(instrument, minutes):
+    if minutes == 1:
+        return load_minutes(instrument)
+
+    path = _derived_path(instrument, minutes)
+    derived = _load(path) if os.path.exists(path) else None
+
+    if derived is not None and len(derived['t']):
+        # the last derived bar may have been built from a partial bucket
+        redo_from = int(derived['t'][-1])
+        derived = _slice(derived, derived['t'] < redo_from)
+        fresh = aggregate(load_minutes(instrument, since=redo_from), minutes)
+        derived = _concat([derived, fresh])
+    else:
+        derived = aggregate(load_minutes(instrument), minutes)
+
+    if len(derived['t']):
+        _save(path, derived)
+    return derived
+
+
+# ==============================
+# SCREENS
+# ==============================
+def summarize_bars(df):
+    ind = indicators.compute_indicators(df)
+    if ind.empty:
+        return None
+
+    close = ind['CLOSE'].iloc[-1]
+    prev_close = ind['CLOSE'].iloc[-2] if len(ind) >= 2 else None
+    new_gtt = ind['HIGH_20D'].iloc[-1]
+    old_gtt = ind['PREV_HIGH_20D'].iloc[-1]
+
+    return {
+        'DATE': ind.index[-1],
+        'CLOSE': close,
+        'CHANGE_PCT': indicators._nan(((close - prev_close) / prev_close) * 100 if prev_close else None),
+        'LOW_20D': ind['LOW_20D'].iloc[-1],
+        'HIGH_20D': new_gtt,
+        'OLD_GTT': old_gtt,
+        'NEW_GTT': new_gtt,
+        'DIFF_PCT': indicators._nan(((new_gtt - close) / close) * 100 if new_gtt and close else None),
+        'BREAKOUT': bool(ind['HIGH'].iloc[-1] >= old_gtt),
+        'DMA_124': ind['DMA_124'].iloc[-1],
+        'RATIO': ind['RATIO'].iloc[-1],
+        'RSI_D': ind['RSI_D'].iloc[-1],
+        'ADX_D': ind['ADX_D'].iloc[-1],
+    }
+
+
+def build_table(symbols, minutes, bars=SCREEN_BARS):
+    # symbols: {symbol: instrument_key}
+    rows = {}
+    for symbol, instrument in symbols.items():
+        try:
+            derived = derive(instrument, minutes)
+            if not len(derived['t']):
+                continue
+            derived = {k: v[-bars:] for k, v in derived.items()}
+            row = summarize_bars(bars_to_frame(derived))
+            if row:
+                rows[symbol] = row
+        except Exception as e:
+            print(f"Error computing {minutes}min bars for {symbol}: {e}")
+
+    table = pd.DataFrame.from_dict(rows, orient='index')
+    table.index.name = 'SYMBOL'
+    return table
+
+
+def load_universe(lists):
+    symbols = {}
+    for path in lists:
+        df = pd.read_csv(path)
+        keys = 'NSE_EQ|' + df['ISIN Code'].astype(str).str.strip()
+        symbols.update(zip(df['Symbol'].str.strip(), keys))
+    return symbols
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intraday screens on Upstox minute candles")
+    parser.add_argument('command', choices=['sync', 'screen'])
+    parser.add_argument('lists', nargs='*', default=['ind_nifty200list.csv'], help='index list CSVs with Symbol and ISIN Code')
+    parser.add_argument('--days', type=int, default=30, help='history to fetch for a new instrument')
+    parser.add_argument('--timeframe', type=int, choices=TIMEFRAMES, default=15, help='bar size in minutes')
+    parser.add_argument('--file', default='screens.txt', help='file with one "name: expression" per line')
+    parser.add_argument('--expr', action='append', default=[], help='screen expression (repeatable, overrides --file)')
+    args = parser.parse_args()
+
+    symbols = load_universe(args.lists)
+
+    if args.command == 'sync':
+        total = 0
+        for symbol, instrument in symbols.items():
+            try:
+                total += sync_minutes(instrument, args.days)
+            except Exception as e:
+                print(f"❌ {symbol}: {e}")
+        print(f"✅ Stored {total} minute bars for {len(symbols)} symbols in {INTRADAY_DIR}")
+        return
+
+    table = build_table(symbols, args.timeframe)
+    print(f"🔍 {len(table)} symbols on {args.timeframe}min bars")
+
+    screens = {expr: expr for expr in args.expr} or screen_expr.read_screens_file(args.file)
+
+    for name, expr in screens.items():
+        try:
+            hits = screen_expr.compile_screen(expr)(table)
+        except screen_expr.ScreenError as e:
+            # e.g. daily-only columns like RSI_W or GTT_UPDATE
+            print(f"⏭️ {name}: {e}")
+            continue
+        print(f"🔍 {name}: {len(hits)} match(es)")
+        if len(hits):
+            print(table.loc[hits, ['DATE', 'CLOSE', 'HIGH_20D', 'RSI_D', 'RATIO']].to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 import pandas as pd
-import urllib.parse
 import pytz
-import requests
 import os
-import ta
+import results_sink
+import strategy_state
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 from gspread.utils import rowcol_to_a1
-from datetime import timedelta
+import fetch_health
+import fetch_planner
+import instrument_master
+import trading_calendar
+import run_journal
 
 # Timezone
 TIME_ZONE = pytz.timezone('Asia/Kolkata')
@@ -27,10 +30,8 @@ def authenticate_gsheet():
 
 # --- STEP 2: FETCH INSTRUMENTS + NIFTY 200 LIST ---
 def load_symbols():
-    symbol_url = 'https://assets.upstox.com/market-quote/instruments/exchange/complete.csv.gz'
-    symboldf = pd.read_csv(symbol_url)
+    symboldf = instrument_master.load_master()
     symboldf['expiry'] = pd.to_datetime(symboldf['expiry'], errors='coerce').dt.date
-    symboldf = symboldf[symboldf.exchange == 'NSE_EQ']
 
     nifty_200 = pd.read_csv('ind_nifty200list.csv')  # <-- Upload this CSV to GitHub
     isinList_200 = 'NSE_EQ|' + nifty_200['ISIN Code'].astype(str).str.strip()
@@ -41,21 +42,8 @@ def load_symbols():
 # --- STEP 3: FETCH HISTORICAL CANDLE DATA ---
 def fetch_historical_candle_data(instrument_key):
     try:
-        encoded_key = urllib.parse.quote(instrument_key)
-        from_date = "2024-10-01"
-        to_date = (datetime.now(TIME_ZONE) + timedelta(days=1)).strftime("%Y-%m-%d")
-
-        url = f'https://api.upstox.com/v2/historical-candle/{encoded_key}/day/{to_date}/{from_date}'
-        headers = {'accept': 'application/json'}
-        res = requests.get(url, headers=headers, timeout=5.0)
-        candle_data = res.json()
-
-        if 'data' in candle_data and 'candles' in candle_data['data'] and candle_data['data']['candles']:
-            df = pd.DataFrame(candle_data['data']['candles'])
-            df.columns = ['date', 'Open', 'High', 'Low', 'Close', 'Volume', 'OI']
-            df['date'] = pd.to_datetime(df['date'])
-            df.set_index('date', inplace=True)
-            df.sort_index(inplace=True)
+        df = fetch_planner.sync_daily_candles(instrument_key, "2024-10-01")
+        if not df.empty:
             return df
         else:
             return None
@@ -64,49 +52,6 @@ def fetch_historical_candle_data(instrument_key):
         return None
 
 
-# --- STEP 4: CALCULATE INDICATORS ---
-def prepare_indicators(df):
-    df = df.copy()
-    df['LTP'] = df['Close']
-    df['124DMA'] = df['LTP'].rolling(window=124).mean()
-    df['Ratio'] = df['LTP'] / df['124DMA']
-    df['rsi'] = ta.momentum.RSIIndicator(close=df['LTP'], window=14).rsi()
-    return df
-
-
-# --- STEP 5: STRATEGY LOGIC ---
-def evaluate_strategy(df, stock_name):
-    trades = []
-    buy_price = None
-    sell_price = None
-    in_observation = False
-
-    for i in range(len(df)):
-        date = df.index[i]
-        row = df.iloc[i]
-        rsi = row['rsi']
-        ratio = row['Ratio']
-        ltp = row['LTP']
-
-        if not in_observation and rsi < 30 and ratio < 0.80:
-            in_observation = True
-
-        elif in_observation and rsi > 30 and buy_price is None:
-            buy_price = ltp
-            trades.append({"Stock": stock_name, "Date": date, "Action": "Buy", "Price": ltp, "RSI": rsi, "Ratio": ratio})
-            in_observation = False
-
-        if buy_price is not None and (ratio > 1.30 or rsi > 70 or ltp < 0.75 * buy_price):
-            sell_price = ltp
-            trades.append({"Stock": stock_name, "Date": date, "Action": "Sell", "Price": ltp, "RSI": rsi, "Ratio": ratio})
-            trades.append({"Stock": stock_name, "Date": date, "Action": "Profit/Loss", "Price": sell_price - buy_price, "RSI": rsi, "Ratio": ratio})
-            buy_price = None
-            sell_price = None
-            in_observation = False
-
-    return trades
-
-
 # --- STEP 6: PUSH TO GOOGLE SHEET ---
 def update_sheet(file_name, df, sheet_name, client):
     try:
@@ -138,26 +83,44 @@ def update_sheet(file_name, df, sheet_name, client):
 
 # --- MAIN DRIVER CODE ---
 def main():
-    client = authenticate_gsheet()
+    if trading_calendar.skip_run():
+        return
+
+    client = authenticate_gsheet() if results_sink.publish_enabled() else None
     nifty_df = load_symbols()
 
     all_trades = []
+    # RESUME=1 reuses trades journaled by an earlier attempt at the same session
+    journal = run_journal.RunJournal('nifty200_screener')
+    # stored strategy state: only bars since the last run are scanned
+    state_conn = strategy_state.connect()
 
-    for _, row in nifty_df.iterrows():
+    for _, row in fetch_health.schedule_frame(nifty_df).iterrows():
         stock = row['tradingsymbol']
         inst_key = row['instrument_key']
+
+        if inst_key in journal:
+            # rows come from the stored ledger, not the journaled copy: the
+            # state is committed before the journal line, so the ledger is
+            # never behind it
+            all_trades.extend(strategy_state.ledger_trades(state_conn, 'SRT-N200', stock))
+            continue
+
         print(f"🔍 Processing: {stock}")
 
         df = fetch_historical_candle_data(inst_key)
         if df is None or df.empty:
             continue
 
-        df = prepare_indicators(df)
-        trades = evaluate_strategy(df, stock)
+        trades = strategy_state.evaluate('SRT-N200', df, stock, conn=state_conn)
+        journal.record(inst_key, trades)
 
         if trades:
             all_trades.extend(trades)
 
+    journal.close()
+    state_conn.close()
+
     if all_trades:
         final_df = pd.DataFrame(all_trades)
         final_df['Date'] = pd.to_datetime(final_df['Date']).dt.tz_localize(None)
@@ -165,7 +128,10 @@ def main():
         final_df['Date'] = final_df['Date'].dt.strftime('%d-%m-%Y')
         
 
-        update_sheet('SRTbk1', final_df, 'Sheet1', client)
+        results_sink.record_outputs('nifty200_screener', {'SRT-N200': final_df})
+
+        if results_sink.publish_enabled():
+            update_sheet('SRTbk1', final_df, 'Sheet1', client)
     else:
         print("⚠️ No trades generated.")
 
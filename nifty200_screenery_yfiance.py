@@ -3,7 +3,9 @@ import csv
 import datetime
 import yfinance as yf
 import pandas as pd
-import ta
+import results_sink
+import strategy_state
+import trading_calendar
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime as dt
@@ -26,49 +28,13 @@ def get_stock_data(symbol, start_date, end_date):
     stock_data = yf.download(symbol + ".NS", start=start_date, end=end_date,progress=True, auto_adjust=True)
     return stock_data
 
-# --- CALCULATE INDICATORS ---
-def get_ltp_and_dma(ticker, start_date, end_date, dma_periods):
+# --- LTP SERIES (RSI / 124DMA ratio are computed by rule_engine) ---
+def get_ltp(ticker, start_date, end_date):
     stock_data = get_stock_data(ticker, start_date, end_date)
     df = pd.DataFrame(index=stock_data.index)
     df['LTP'] = stock_data['Close']
-    for period in dma_periods:
-        df[f"{period}DMA"] = df['LTP'].rolling(window=period).mean()
-    df['rsi'] = ta.momentum.RSIIndicator(df['LTP']).rsi()
-    df['Ratio'] = df['LTP'] / df['124DMA']
     return df
 
-# --- STRATEGY EVALUATION ---
-def evaluate_strategy(df, stock_name):
-    buy_price = None
-    sell_price = None
-    in_observation = False
-    trades = []
-
-    for i in range(len(df)):
-        date = df.index[i]
-        row = df.iloc[i]
-        rsi = row['rsi']
-        ratio = row['Ratio']
-        ltp = row['LTP']
-
-        if not in_observation and rsi < 30 and ratio < 0.80:
-            in_observation = True
-
-        elif in_observation and rsi > 30 and buy_price is None:
-            buy_price = ltp
-            trades.append({"Stock": stock_name, "Date": date, "Action": "Buy", "Price": ltp, "RSI": rsi, "Ratio": ratio})
-            in_observation = False
-
-        if buy_price is not None and (ratio > 1.30 or rsi > 70 or ltp < 0.75 * buy_price):
-            sell_price = ltp
-            trades.append({"Stock": stock_name, "Date": date, "Action": "Sell", "Price": ltp, "RSI": rsi, "Ratio": ratio})
-            trades.append({"Stock": stock_name, "Date": date, "Action": "Profit/Loss", "Price": sell_price - buy_price, "RSI": rsi, "Ratio": ratio})
-            buy_price = None
-            sell_price = None
-            in_observation = False
-
-    return trades
-
 # --- READ SYMBOLS FROM CSV ---
 def read_stock_symbols_from_csv(file_path):
     df = pd.read_csv(file_path)
@@ -104,26 +70,34 @@ def update_sheet(file_name, df, sheet_name, client):
 
 # --- MAIN DRIVER ---
 def main():
-    client = authenticate_gsheet()
+    if trading_calendar.skip_run():
+        return
+
+    client = authenticate_gsheet() if results_sink.publish_enabled() else None
     start_date = "2024-10-01"
     end_date = (dt.today() + timedelta(days=1)).strftime('%Y-%m-%d')
 
-    dma_periods = [20, 50, 124, 200]
     stocks = read_stock_symbols_from_csv('ind_nifty500list.csv')
 
     all_trades = []
+    state_conn = strategy_state.connect()
 
     for stock in stocks:
-        df = get_ltp_and_dma(stock, start_date, end_date, dma_periods)
-        trades = evaluate_strategy(df, stock)
+        df = get_ltp(stock, start_date, end_date)
+        trades = strategy_state.evaluate('SRT-N500-YF', df, stock, conn=state_conn)
         if trades:
             all_trades.extend(trades)
 
+    state_conn.close()
+
     if all_trades:
         final_df = pd.DataFrame(all_trades)
         final_df['Date'] = pd.to_datetime(final_df['Date']).dt.strftime('%d-%m-%Y')
         final_df.sort_values(by=['Stock', 'Date'], inplace=True)
-        update_sheet('SRTbk1yf', final_df, 'Sheet1', client)
+        results_sink.record_outputs('nifty200_screenery_yfiance', {'SRT-N500-YF': final_df})
+
+        if results_sink.publish_enabled():
+            update_sheet('SRTbk1yf', final_df, 'Sheet1', client)
     else:
         print("⚠️ No trades generated.")
 
@@ -0,0 +1,137 @@
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Fetch -> compute -> publish stages connected by bounded queues.
+#
+#   groups   [(name, [item, ...]), ...]  e.g. [('SST-N50', rows), ('SST-N100', rows)]
+#   fetch    fetch(item) -> payload | None          network I/O, thread pool
+#   compute  compute(item, payload) -> result | None  CPU work, worker threads
+#                                                     (or a process pool)
+#   publish  publish(name, results)                 called once per group, in
+#                                                   group order, as soon as the
+#                                                   group's last item is computed
+#
+# Fetch threads block when the compute queue is full and finished groups queue
+# up for the single publish thread, so wall time approaches the slowest stage
+# instead of the sum of all three.
+
+_DONE = object()
+
+
+class _Group:
+
+    def __init__(self, index, name, size):
+        self.index = index
+        self.name = name
+        self.results = [None] * size
+        self.remaining = size
+
+
+def run_pipeline(groups, fetch, compute, publish, fetch_workers=8, compute_workers=2,
+                 compute_processes=0, queue_size=32):
+
+    compute_q = queue.Queue(maxsize=queue_size)
+    publish_q = queue.Queue(maxsize=max(1, len(groups)))
+    lock = threading.Lock()
+    errors = []
+
+    states = [_Group(i, name, len(items)) for i, (name, items) in enumerate(groups)]
+    ready = {}
+    next_to_publish = [0]
+
+    def release_ready():
+        # publish groups strictly in the order they were given
+        while next_to_publish[0] in ready:
+            group = ready.pop(next_to_publish[0])
+            publish_q.put(group)
+            next_to_publish[0] += 1
+
+    def finish_item(group, pos, result):
+        with lock:
+            group.results[pos] = result
+            group.remaining -= 1
+            if group.remaining == 0:
+                ready[group.index] = group
+                release_ready()
+
+    # groups without items complete immediately
+    with lock:
+        for group in states:
+            if group.remaining == 0:
+                ready[group.index] = group
+        release_ready()
+
+    # ------------------------------
+    # stage 1: fetch
+    # ------------------------------
+    def fetch_one(group, pos, item):
+        try:
+            payload = fetch(item)
+        except Exception as e:
+            errors.append(('fetch', item, e))
+            print(f"❌ Fetch failed: {e}")
+            payload = None
+        if payload is None:
+            finish_item(group, pos, None)
+        else:
+            compute_q.put((group, pos, item, payload))
+
+    # ------------------------------
+    # stage 2: compute
+    # ------------------------------
+    process_pool = ProcessPoolExecutor(max_workers=compute_processes) if compute_processes else None
+
+    def compute_worker():
+        while True:
+            task = compute_q.get()
+            if task is _DONE:
+                return
+            group, pos, item, payload = task
+            try:
+                if process_pool is not None:
+                    result = process_pool.submit(compute, item, payload).result()
+                else:
+                    result = compute(item, payload)
+            except Exception as e:
+                errors.append(('compute', item, e))
+                print(f"❌ Compute failed: {e}")
+                result = None
+            finish_item(group, pos, result)
+
+    # ------------------------------
+    # stage 3: publish
+    # ------------------------------
+    def publish_worker():
+        for _ in range(len(states)):
+            group = publish_q.get()
+            results = [r for r in group.results if r is not None]
+            try:
+                publish(group.name, results)
+            except Exception as e:
+                errors.append(('publish', group.name, e))
+                print(f"❌ Publish failed for {group.name}: {e}")
+                traceback.print_exc()
+
+    publisher = threading.Thread(target=publish_worker, name='publish', daemon=True)
+    computers = [threading.Thread(target=compute_worker, name=f'compute-{i}', daemon=True) for i in range(max(1, compute_workers))]
+    publisher.start()
+    for t in computers:
+        t.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool:
+            for group, (_, items) in zip(states, groups):
+                for pos, item in enumerate(items):
+                    fetch_pool.submit(fetch_one, group, pos, item)
+    finally:
+        for _ in computers:
+            compute_q.put(_DONE)
+        for t in computers:
+            t.join()
+        if process_pool is not None:
+            process_pool.shutdown()
+        publisher.join()
+
+    return errors
@@ -0,0 +1,218 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+import price_panel
+import results_sink
+
+# Portfolio simulation over the SRT trade ledger (Buy / Sell / Profit/Loss rows).
+#
+# Signals for the whole universe go through one event queue in date order
+# (sells before buys on the same day, so a freed slot can be reused). Each buy
+# gets an equal slot of current equity, capped by cash, with at most
+# max_positions open at once; costs are charged per side in basis points.
+# The equity curve is then marked to market in one vectorized pass over a
+# dates x symbols close matrix.
+
+TRADING_DAYS = 252
+
+_ACTION_ORDER = {'Sell': 0, 'Buy': 1}
+
+
+# ==============================
+# INPUT
+# ==============================
+def signals_from_ledger(ledger):
+
+    df = ledger[ledger['Action'].isin(['Buy', 'Sell'])].copy()
+    if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'], dayfirst=True)
+    if getattr(df['Date'].dt, 'tz', None) is not None:
+        df['Date'] = df['Date'].dt.tz_localize(None)
+    df['Date'] = df['Date'].dt.normalize()
+    df['Price'] = df['Price'].astype(float)
+    df['order'] = df['Action'].map(_ACTION_ORDER)
+    df = df.sort_values(['Date', 'order', 'Stock'], kind='mergesort')
+    return df[['Date', 'Stock', 'Action', 'Price']].reset_index(drop=True)
+
+
+def closes_from_signals(signals):
+    # Fallback marks: each symbol is valued at its last traded signal price.
+    closes = signals.pivot_table(index='Date', columns='Stock', values='Price', aggfunc='last')
+    return closes.sort_index().ffill()
+
+
+def closes_from_panel(panel, symbols):
+    present = [s for s in symbols if s in panel]
+    if not present:
+        return None
+    idx = [panel.symbol_index[s] for s in present]
+    return pd.DataFrame(panel.field('Close')[:, idx], index=panel.dates, columns=present)
+
+
+# ==============================
+# SIMULATION
+# ==============================
+def simulate(signals, closes=None, capital=1_000_000.0, max_positions=10, cost_bps=10.0):
+
+    cost = cost_bps / 10000.0
+    if closes is None:
+        closes = closes_from_signals(signals)
+
+    # signal prices fill any hole in the close matrix (missing symbol or date)
+    marks = closes.combine_first(closes_from_signals(signals)).sort_index().ffill()
+    symbols = list(marks.columns)
+    col = {s: j for j, s in enumerate(symbols)}
+    dates = marks.index
+    row_of = {d: i for i, d in enumerate(dates)}
+
+    cash = capital
+    held = {}            # stock -> (shares, entry_price, entry_date, entry_cost)
+    last_mark = {}
+    share_delta = np.zeros((len(dates), len(symbols)))
+    cash_flow = np.zeros(len(dates))
+    trades = []
+    skipped = 0
+
+    for date, stock, action, price in signals.itertuples(index=False):
+        i = row_of[date]
+        last_mark[stock] = price
+
+        if action == 'Sell':
+            if stock not in held:
+                continue
+            shares, entry_price, entry_date, entry_cost = held.pop(stock)
+            proceeds = shares * price * (1 - cost)
+            cash += proceeds
+            cash_flow[i] += proceeds
+            share_delta[i, col[stock]] -= shares
+            trades.append({
+                'Stock': stock,
+                'Entry Date': entry_date,
+                'Entry Price': entry_price,
+                'Exit Date': date,
+                'Exit Price': price,
+                'Shares': shares,
+                'P&L': proceeds - entry_cost,
+                'Return %': (proceeds / entry_cost - 1) * 100,
+            })
+            continue
+
+        if stock in held:
+            continue
+        if len(held) >= max_positions:
+            skipped += 1
+            continue
+
+        row = marks.iloc[i]
+        equity = cash + sum(h[0] * (row[s] if pd.notnull(row[s]) else last_mark.get(s, h[1])) for s, h in held.items())
+        budget = min(cash, equity / max_positions)
+        shares = np.floor(budget / (price * (1 + cost)))
+        if shares < 1:
+            skipped += 1
+            continue
+
+        entry_cost = shares * price * (1 + cost)
+        cash -= entry_cost
+        cash_flow[i] -= entry_cost
+        share_delta[i, col[stock]] += shares
+        held[stock] = (shares, price, date, entry_cost)
+
+    holdings = np.cumsum(share_delta, axis=0)
+    cash_curve = capital + np.cumsum(cash_flow)
+    invested = np.nansum(holdings * marks.to_numpy(), axis=1)
+
+    equity = pd.DataFrame({
+        'Cash': cash_curve,
+        'Invested': invested,
+        'Equity': cash_curve + invested,
+        'Positions': (holdings > 0).sum(axis=1),
+    }, index=dates)
+    equity.index.name = 'Date'
+
+    trades = pd.DataFrame(trades, columns=['Stock', 'Entry Date', 'Entry Price', 'Exit Date', 'Exit Price', 'Shares', 'P&L', 'Return %'])
+    open_positions = pd.DataFrame(
+        [{'Stock': s, 'Entry Date': h[2], 'Entry Price': h[1], 'Shares': h[0]} for s, h in held.items()],
+        columns=['Stock', 'Entry Date', 'Entry Price', 'Shares'],
+    )
+    return equity, trades, open_positions, statistics(equity, trades, capital, skipped)
+
+
+def statistics(equity, trades, capital, skipped=0):
+
+    curve = equity['Equity']
+    if curve.empty:
+        return {}
+
+    years = max((curve.index[-1] - curve.index[0]).days / 365.25, 1 / 365.25)
+    final = curve.iloc[-1]
+    drawdown = curve / curve.cummax() - 1
+    daily = curve.pct_change().dropna()
+
+    stats = {
+        'Start': curve.index[0].strftime('%d-%m-%Y'),
+        'End': curve.index[-1].strftime('%d-%m-%Y'),
+        'Capital': capital,
+        'Final Equity': round(final, 2),
+        'Total Return %': round((final / capital - 1) * 100, 2),
+        'CAGR %': round(((final / capital) ** (1 / years) - 1) * 100, 2),
+        'Max Drawdown %': round(drawdown.min() * 100, 2),
+        'Sharpe': round(daily.mean() / daily.std() * np.sqrt(TRADING_DAYS), 2) if daily.std() > 0 else None,
+        'Closed Trades': len(trades),
+        'Win Rate %': round((trades['P&L'] > 0).mean() * 100, 2) if len(trades) else None,
+        'Avg Trade %': round(trades['Return %'].mean(), 2) if len(trades) else None,
+        'Exposure %': round((equity['Invested'] / curve).mean() * 100, 2),
+        'Max Positions Used': int(equity['Positions'].max()),
+        'Skipped Signals': skipped,
+    }
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in stats.items()}
+
+
+# ==============================
+# CLI
+# ==============================
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the SRT ledger as a portfolio")
+    parser.add_argument('--output', default='SRT-N200', help='ledger output name in the results store')
+    parser.add_argument('--ledger', help='read the ledger from a CSV instead')
+    parser.add_argument('--capital', type=float, default=1_000_000.0)
+    parser.add_argument('--max-positions', type=int, default=10)
+    parser.add_argument('--cost-bps', type=float, default=10.0)
+    parser.add_argument('--no-panel', action='store_true', help='mark positions at signal prices only')
+    parser.add_argument('--save', action='store_true', help='record equity curve and trades in the results store')
+    args = parser.parse_args()
+
+    if args.ledger:
+        ledger = pd.read_csv(args.ledger)
+    else:
+        conn = results_sink.connect()
+        ledger = results_sink.read_output(conn, args.output)
+        conn.close()
+        if ledger.empty:
+            print(f"⚠️ No ledger '{args.output}' in {results_sink.RESULTS_DB_PATH}")
+            return
+        ledger = ledger[ledger['run_id'] == ledger['run_id'].max()]
+
+    signals = signals_from_ledger(ledger)
+    closes = None
+    if not args.no_panel:
+        panel = price_panel.open_panel()
+        if panel is not None:
+            closes = closes_from_panel(panel, signals['Stock'].unique())
+
+    equity, trades, open_positions, stats = simulate(signals, closes, args.capital, args.max_positions, args.cost_bps)
+
+    for key, value in stats.items():
+        print(f"{key:>20}: {value}")
+    print(f"{'Open Positions':>20}: {len(open_positions)}")
+
+    if args.save:
+        results_sink.record_outputs('portfolio_sim', {
+            'SIM-EQUITY': equity.reset_index(),
+            'SIM-TRADES': trades,
+            'SIM-STATS': pd.DataFrame([stats]),
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+import candle_store
+
+# Memory-mapped dates x symbols price panel.
+#
+#   data/panel/meta.json    symbols, fields, n_dates (rows in use), capacity
+#   data/panel/dates.npy    datetime64[D], shape (capacity,)
+#   data/panel/<field>.npy  float64, shape (capacity, n_symbols), NaN = no bar
+#
+# data/panel is built from the candle store and keyed by instrument_key; the
+# yfinance download in indicators.py keeps its plain-NSE-symbol panel in
+# data/panel-yf, so neither overwrites the other's symbol namespace.
+#
+# Planes are row-major so a new trading day is one contiguous row write, and
+# np.load(mmap_mode='r') lets any number of processes share the same pages.
+
+PANEL_DIR = os.path.join(candle_store.DATA_DIR, 'panel')
+YF_PANEL_DIR = os.path.join(candle_store.DATA_DIR, 'panel-yf')
+PANEL_VERSION = 1
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+GROW_ROWS = 260
+
+
+def _plane_path(path, field):
+    return os.path.join(path, f"{field.lower()}.npy")
+
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+
+
+def _read_meta(path):
+    with open(os.path.join(path, 'meta.json')) as f:
+        return json.load(f)
+
+
+# ==============================
+# BUILD
+# ==============================
+def write_panel(histories, path=PANEL_DIR, extra_rows=GROW_ROWS):
+
+    histories = {s: df for s, df in histories.items() if df is not None and not df.empty}
+    symbols = list(histories)
+
+    per_symbol_dates = {}
+    for symbol, df in histories.items():
+        idx = pd.DatetimeIndex(df.index)
+        if idx.tz is not None:
+            idx = idx.tz_localize(None)
+        per_symbol_dates[symbol] = idx.normalize().values.astype('datetime64[D]')
+
+    all_dates = np.unique(np.concatenate(list(per_symbol_dates.values()))) if symbols else np.array([], dtype='datetime64[D]')
+    n_dates = len(all_dates)
+    capacity = n_dates + extra_rows
+
+    os.makedirs(path, exist_ok=True)
+
+    dates = np.lib.format.open_memmap(os.path.join(path, 'dates.npy'), mode='w+', dtype='datetime64[D]', shape=(capacity,))
+    dates[:n_dates] = all_dates
+    dates.flush()
+
+    for field in FIELDS:
+        plane = np.lib.format.open_memmap(_plane_path(path, field), mode='w+', dtype='float64', shape=(capacity, len(symbols)))
+        plane[:] = np.nan
+        for j, symbol in enumerate(symbols):
+            df = histories[symbol]
+            if field not in df:
+                continue
+            rows = np.searchsorted(all_dates, per_symbol_dates[symbol])
+            plane[rows, j] = df[field].to_numpy(dtype='float64')
+        plane.flush()
+        del plane
+
+    _write_meta(path, {
+        'version': PANEL_VERSION,
+        'symbols': symbols,
+        'fields': FIELDS,
+        'n_dates': int(n_dates),
+        'capacity': int(capacity),
+        # changes on every rebuild (e.g. after corporate-action adjustments), not on append_day
+        'build_id': datetime.now().strftime('%Y%m%dT%H%M%S.%f'),
+    })
+    return PricePanel(path)
+
+
+def build_from_store(instruments=None, path=PANEL_DIR):
+    import corporate_actions
+
+    conn = candle_store.connect()
+    try:
+        instruments = instruments or candle_store.list_instruments(conn)
+        histories = {i: corporate_actions.load_adjusted_candles(conn, i) for i in instruments}
+    finally:
+        conn.close()
+    return write_panel(histories, path)
+
+
+# ==============================
+# PANEL
+# ==============================
+class PricePanel:
+
+    def __init__(self, path=PANEL_DIR, mode='r'):
+        self.path = path
+        self.mode = mode
+        self._load()
+
+    def _load(self):
+        meta = _read_meta(self.path)
+        if meta.get('version') != PANEL_VERSION:
+            raise ValueError(f"Unsupported panel version {meta.get('version')} in {self.path}")
+        self.symbols = meta['symbols']
+        self.fields = meta['fields']
+        self.n_dates = meta['n_dates']
+        self.capacity = meta['capacity']
+        self.build_id = meta.get('build_id')
+        self.symbol_index = {s: j for j, s in enumerate(self.symbols)}
+        self._dates = np.load(os.path.join(self.path, 'dates.npy'), mmap_mode=self.mode)
+        self._planes = {f: np.load(_plane_path(self.path, f), mmap_mode=self.mode) for f in self.fields}
+
+    def __len__(self):
+        return self.n_dates
+
+    def __contains__(self, symbol):
+        return symbol in self.symbol_index
+
+    @property
+    def dates(self):
+        return pd.DatetimeIndex(self._dates[:self.n_dates])
+
+    def field(self, field):
+        # (n_dates, n_symbols) view straight onto the mapped file
+        return self._planes[field][:self.n_dates]
+
+    def column(self, symbol, field='Close'):
+        return self._planes[field][:self.n_dates, self.symbol_index[symbol]]
+
+    def frame(self, symbol, dropna=True):
+        j = self.symbol_index[symbol]
+        df = pd.DataFrame({f: self._planes[f][:self.n_dates, j] for f in self.fields}, index=self.dates)
+        df.index.name = 'date'
+        return df.dropna(subset=['Close']) if dropna else df
+
+    def histories(self, symbols=None):
+        for symbol in symbols or self.symbols:
+            if symbol in self.symbol_index:
+                yield symbol, self.frame(symbol)
+
+    def last_date(self):
+        return pd.Timestamp(self._dates[self.n_dates - 1]) if self.n_dates else None
+
+    # ------------------------------
+    # in-place extension
+    # ------------------------------
+    def append_day(self, date, bars):
+        # bars: {symbol: {'Open': .., 'High': .., 'Low': .., 'Close': .., 'Volume': ..}}
+        if self.mode != 'r+':
+            raise ValueError("Panel opened read-only; use PricePanel(path, mode='r+') to append")
+
+        day = np.datetime64(pd.Timestamp(date).date(), 'D')
+        if self.n_dates and day <= self._dates[self.n_dates - 1]:
+            row = int(np.searchsorted(self._dates[:self.n_dates], day))
+            if self._dates[row] != day:
+                raise ValueError(f"{day} is older than the panel's last date and not already present")
+        else:
+            if self.n_dates == self.capacity:
+                self._grow()
+            row = self.n_dates
+            self._dates[row] = day
+            for plane in self._planes.values():
+                plane[row] = np.nan
+
+        for symbol, bar in bars.items():
+            j = self.symbol_index.get(symbol)
+            if j is None:
+                continue
+            for f, value in bar.items():
+                if f in self._planes:
+                    self._planes[f][row, j] = value
+
+        for plane in self._planes.values():
+            plane.flush()
+        self._dates.flush()
+
+        if row == self.n_dates:
+            self.n_dates += 1
+            meta = _read_meta(self.path)
+            meta['n_dates'] = self.n_dates
+            _write_meta(self.path, meta)
+
+    def _grow(self):
+        capacity = self.capacity + GROW_ROWS
+        for name, old in [('dates', self._dates)] + list(self._planes.items()):
+            path = os.path.join(self.path, 'dates.npy') if name == 'dates' else _plane_path(self.path, name)
+            tmp = path + '.tmp'
+            shape = (capacity,) + old.shape[1:]
+            new = np.lib.format.open_memmap(tmp, mode='w+', dtype=old.dtype, shape=shape)
+            new[:self.capacity] = old
+            if name != 'dates':
+                new[self.capacity:] = np.nan
+            new.flush()
+            del new
+            os.replace(tmp, path)
+
+        meta = _read_meta(self.path)
+        meta['capacity'] = capacity
+        _write_meta(self.path, meta)
+        self._load()
+
+
+def open_panel(path=PANEL_DIR, mode='r'):
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    return PricePanel(path, mode)
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == 'build':
+        panel = build_from_store(sys.argv[2:] or None)
+        print(f"✅ Panel built: {len(panel)} dates x {len(panel.symbols)} symbols -> {panel.path}")
+    else:
+        panel = open_panel()
+        if panel is None:
+            print(f"⚠️ No panel at {PANEL_DIR}; run 'python price_panel.py build'")
+            return
+        print(f"📦 {len(panel)} dates x {len(panel.symbols)} symbols, last date {panel.last_date():%d-%b-%Y}, capacity {panel.capacity}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import os
+import re
+import sys
+import sqlite3
+import pandas as pd
+import pytz
+from datetime import datetime, timedelta
+
+import candle_store
+
+# Append-only local history of every run's outputs (SST rows, SRT ledgers, ...).
+# Each output name gets its own table; every row carries run_id and run_date so
+# a day's results can be scanned without touching any other day.
+# Google Sheets publishing is an optional step after this (PUBLISH_SHEETS=0 skips it).
+
+RESULTS_DB_PATH = os.path.join(candle_store.DATA_DIR, 'results.db')
+
+TIME_ZONE = pytz.timezone('Asia/Kolkata')
+
+SYMBOL_COLUMNS = ['Stock', 'Ticker', 'Symbol', 'SYMBOL']
+GTT_COLUMNS = ['GTT Update', 'GTT UPDATE', 'GTT_UPDATE']
+TRIGGER_DATE_COLUMNS = ['TRIGGER DATE', 'TRIGGER_DATE']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_date    TEXT NOT NULL,
+    script      TEXT NOT NULL,
+    started_at  TEXT NOT NULL,
+    finished_at TEXT,
+    status      TEXT
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    run_id   INTEGER NOT NULL,
+    output   TEXT NOT NULL,
+    tbl      TEXT NOT NULL,
+    rows     INTEGER NOT NULL,
+    PRIMARY KEY (run_id, output)
+);
+"""
+
+
+def publish_enabled():
+    return os.environ.get('PUBLISH_SHEETS', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+# ==============================
+# CONNECTION
+# ==============================
+def connect(path=RESULTS_DB_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30.0)
+    conn.execute('PRAGMA journal_mode=WAL')
+    with candle_store.WRITE_LOCK:
+        conn.executescript(_SCHEMA)
+    return conn
+
+
+def table_name(output):
+    return 'out_' + re.sub(r'[^0-9a-zA-Z]+', '_', output).strip('_').lower()
+
+
+def _now():
+    return datetime.now(TIME_ZONE)
+
+
+# ==============================
+# WRITE
+# ==============================
+def start_run(conn, script, run_date=None):
+    run_date = (run_date or _now()).strftime('%Y-%m-%d')
+    with candle_store.writing(conn):
+        cur = conn.execute(
+            'INSERT INTO runs (run_date, script, started_at, status) VALUES (?, ?, ?, ?)',
+            (run_date, script, _now().isoformat(), 'running'),
+        )
+    return cur.lastrowid
+
+
+def finish_run(conn, run_id, status='ok'):
+    with candle_store.writing(conn):
+        conn.execute('UPDATE runs SET finished_at = ?, status = ? WHERE run_id = ?', (_now().isoformat(), status, run_id))
+
+
+def _add_missing_columns(conn, tbl, columns):
+    existing = {r[1] for r in conn.execute(f'PRAGMA table_info("{tbl}")')}
+    if not existing:
+        return
+    for col in columns:
+        if col not in existing:
+            conn.execute(f'ALTER TABLE "{tbl}" ADD COLUMN "{col}"')
+
+
+def record(conn, run_id, output, df):
+
+    if df is None or df.empty:
+        return 0
+
+    run_date = conn.execute('SELECT run_date FROM runs WHERE run_id = ?', (run_id,)).fetchone()[0]
+    tbl = table_name(output)
+
+    rows = df.copy()
+    for col in rows.columns:
+        if pd.api.types.is_datetime64_any_dtype(rows[col]):
+            rows[col] = rows[col].astype(str)
+    rows.insert(0, 'run_date', run_date)
+    rows.insert(0, 'run_id', run_id)
+
+    with candle_store.writing(conn):
+        _add_missing_columns(conn, tbl, rows.columns)
+        rows.to_sql(tbl, conn, if_exists='append', index=False)
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{tbl}_run_date" ON "{tbl}" (run_date)')
+        conn.execute('INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?)', (run_id, output, tbl, len(rows)))
+    return len(rows)
+
+
+def open_run(script, run_date=None):
+    conn = connect()
+    try:
+        return start_run(conn, script, run_date)
+    finally:
+        conn.close()
+
+
+def record_output(run_id, output, df):
+    # own connection, so pipeline publish threads can record independently
+    conn = connect()
+    try:
+        return record(conn, run_id, output, df)
+    finally:
+        conn.close()
+
+
+def close_run(run_id, status='ok'):
+    conn = connect()
+    try:
+        finish_run(conn, run_id, status)
+    finally:
+        conn.close()
+
+
+def record_outputs(script, outputs, run_date=None):
+    # outputs: {output name: DataFrame}, e.g. {'SST-N50': df, ...}
+    run_id = open_run(script, run_date)
+    total = 0
+    for output, df in outputs.items():
+        total += record_output(run_id, output, df)
+    close_run(run_id)
+    print(f"💾 Saved {total} rows from {script} (run {run_id}) to {RESULTS_DB_PATH}")
+    return run_id
+
+
+# ==============================
+# READ
+# ==============================
+def read_output(conn, output, since=None, until=None, symbol=None):
+
+    tbl = table_name(output)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tbl,)).fetchone():
+        return pd.DataFrame()
+
+    query = f'SELECT * FROM "{tbl}" WHERE 1 = 1'
+    params = []
+    if since is not None:
+        query += ' AND run_date >= ?'
+        params.append(pd.Timestamp(since).strftime('%Y-%m-%d'))
+    if until is not None:
+        query += ' AND run_date <= ?'
+        params.append(pd.Timestamp(until).strftime('%Y-%m-%d'))
+
+    df = pd.read_sql_query(query, conn, params=params)
+    if symbol is not None:
+        col = _first_present(df, SYMBOL_COLUMNS)
+        if col:
+            df = df[df[col] == symbol]
+    return df
+
+
+def list_outputs(conn):
+    return pd.read_sql_query(
+        'SELECT o.output, COUNT(*) AS runs, SUM(o.rows) AS rows, MIN(r.run_date) AS first, MAX(r.run_date) AS last '
+        'FROM outputs o JOIN runs r USING (run_id) GROUP BY o.output ORDER BY o.output',
+        conn,
+    )
+
+
+def _first_present(df, candidates):
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+def gtt_trigger_history(conn, symbol, months=6, outputs=None):
+
+    since = _now() - timedelta(days=months * 30)
+    if outputs is None:
+        outputs = list(list_outputs(conn)['output'])
+
+    hits = []
+    for output in outputs:
+        df = read_output(conn, output, since=since, symbol=symbol)
+        gtt_col = _first_present(df, GTT_COLUMNS)
+        if df.empty or not gtt_col:
+            continue
+        df = df[df[gtt_col] == 'TRIGGERED']
+        date_col = _first_present(df, TRIGGER_DATE_COLUMNS)
+        for _, row in df.iterrows():
+            hits.append({'output': output, 'run_date': row['run_date'], 'trigger_date': row[date_col] if date_col else None})
+
+    hits = pd.DataFrame(hits, columns=['output', 'run_date', 'trigger_date'])
+    # A trade stays TRIGGERED in every later run; count distinct trigger dates.
+    return hits.drop_duplicates(subset=['output', 'trigger_date'])
+
+
+def main():
+    conn = connect()
+    if len(sys.argv) >= 3 and sys.argv[1] == 'gtt':
+        months = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+        hits = gtt_trigger_history(conn, sys.argv[2], months)
+        print(f"🔍 {sys.argv[2]}: GTT triggered {len(hits)} time(s) in the last {months} months")
+        if not hits.empty:
+            print(hits.to_string(index=False))
+    else:
+        print(list_outputs(conn).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import ast
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+import instrument_master
+import price_panel
+import results_sink
+import screen_expr
+
+# Declarative entry / exit rules for the SRT-style strategies, run as one
+# vectorized state-machine scan over every symbol at once.
+#
+# A strategy is data: screen expressions (screen_expr syntax) over the fields
+#   LTP, DMA_124, RATIO (LTP / DMA_124), RSI (14, Wilder, as ta) and BUY_PRICE
+# (the open position's entry price, NaN when flat):
+#
+#   observe  start watching            e.g. RSI < 30 and RATIO < 0.80
+#   entry    buy while watching, flat  e.g. RSI > 30
+#   exit     sell while holding        e.g. RATIO > 1.30 or RSI > 70 or LTP < 0.75 * BUY_PRICE
+#
+# Per bar, in the same order as the SRT scripts' original per-symbol loops:
+# observation starts on `observe`; otherwise a watched, flat symbol buys on
+# `entry` and stops watching; then a held symbol sells on `exit` and resets.
+# A comparison involving a missing value is False.
+#
+# Histories are right-aligned into a bars x symbols array (each symbol's own
+# bars, no calendar gaps), so indicators match the per-symbol scripts exactly
+# and the scan is one pass over rows with array operations across symbols.
+# Rules that do not reference BUY_PRICE are evaluated once for the whole array.
+#
+#   python rule_engine.py --strategy SRT-ETF ETF.csv
+#   python rule_engine.py --observe 'RSI < 25 and RATIO < 0.75' --entry 'RSI > 25' --exit 'RSI > 65'
+
+SRT_30 = {
+    'observe': 'RSI < 30 and RATIO < 0.80',
+    'entry': 'RSI > 30',
+    'exit': 'RATIO > 1.30 or RSI > 70 or LTP < 0.75 * BUY_PRICE',
+}
+
+STRATEGIES = {
+    'SRT-N200': SRT_30,
+    'SRT-N500-YF': SRT_30,
+    'SRT-N100-YF': {
+        'observe': 'RSI < 35 and RATIO < 0.85',
+        'entry': 'RSI > 35',
+        'exit': 'RATIO > 1.30 or RSI > 75 or LTP < 0.75 * BUY_PRICE',
+    },
+    'SRT-ETF': {
+        'observe': 'RSI < 35 and RATIO < 0.95',
+        'entry': 'RSI > 35',
+        'exit': 'RATIO > 1.30 or RSI > 75 or LTP < 0.75 * BUY_PRICE',
+    },
+}
+
+RULES = ['observe', 'entry', 'exit']
+
+
+# ==============================
+# ALIGNED BARS
+# ==============================
+class Bars:
+
+    def __init__(self, symbols, close, pad, indexes):
+        self.symbols = list(symbols)
+        self.close = close          # (rows, symbols), each column's bars at the bottom
+        self.pad = pad              # leading NaN rows per symbol
+        self.indexes = indexes      # per-symbol bar dates
+        self.fields = prepare_fields(close)
+
+    def __len__(self):
+        return len(self.close)
+
+    def date(self, row, j):
+        return self.indexes[j][row - self.pad[j]]
+
+    def row_of(self, j, date):
+        # first row after `date` for symbol j
+        return self.pad[j] + int(self.indexes[j].searchsorted(date, side='right'))
+
+
+def from_histories(histories):
+    # histories: {symbol: DataFrame with LTP or Close}
+    histories = {s: df for s, df in histories.items() if df is not None and len(df)}
+    rows = max((len(df) for df in histories.values()), default=0)
+    close = np.full((rows, len(histories)), np.nan)
+    pad = np.zeros(len(histories), dtype=int)
+    for j, df in enumerate(histories.values()):
+        values = (df['LTP'] if 'LTP' in df else df['Close']).to_numpy(dtype=float)
+        pad[j] = rows - len(values)
+        close[pad[j]:, j] = values
+    return Bars(histories, close, pad, [df.index for df in histories.values()])
+
+
+def from_panel(panel, symbols=None):
+    symbols = [s for s in (symbols or panel.symbols) if s in panel]
+    cols = [panel.symbol_index[s] for s in symbols]
+    close = np.array(panel.field('Close')[:, cols])
+    valid = ~np.isnan(close)
+    # stable sort moves each column's missing rows to the top, bars keep their order
+    order = np.argsort(valid, axis=0, kind='stable')
+    dates = panel.dates
+    indexes = [dates[valid[:, j]] for j in range(len(symbols))]
+    return Bars(symbols, np.take_along_axis(close, order, axis=0), (~valid).sum(axis=0), indexes)
+
+
+def prepare_fields(close):
+    # the SRT scripts' indicators (124-bar DMA ratio, 14-bar Wilder RSI as in ta), column-wise
+    ltp = pd.DataFrame(close)
+    dma = ltp.rolling(window=124).mean()
+
+    diff = ltp.diff(1)
+    up = diff.where(diff > 0, 0.0).where(ltp.notna())
+    down = -diff.where(diff < 0, 0.0).where(ltp.notna())
+    emaup = up.ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    emadn = down.ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+    rsi = np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+
+    return {
+        'LTP': close,
+        'DMA_124': dma.to_numpy(),
+        'RATIO': (ltp / dma).to_numpy(),
+        'RSI': rsi,
+    }
+
+
+# ==============================
+# SCAN
+# ==============================
+def compile_strategy(rules):
+    missing = [r for r in RULES if r not in rules]
+    if missing:
+        raise screen_expr.ScreenError(f"Strategy is missing rule(s): {', '.join(missing)}")
+    return {r: screen_expr.compile_screen(rules[r]) for r in RULES}
+
+
+_THRESHOLD_OPS = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>='}
+_FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+
+def thresholds(expr):
+    # the plain FIELD <op> number comparisons in a rule, e.g.
+    # 'RSI < 30 and RATIO < 0.80' -> [('RSI', '<', 30.0), ('RATIO', '<', 0.8)]
+    out = []
+    for node in ast.walk(ast.parse(expr.strip(), mode='eval')):
+        if not isinstance(node, ast.Compare) or len(node.ops) != 1 or type(node.ops[0]) not in _THRESHOLD_OPS:
+            continue
+        op = _THRESHOLD_OPS[type(node.ops[0])]
+        left, right = node.left, node.comparators[0]
+        if isinstance(left, ast.Constant) and isinstance(right, ast.Name):
+            left, right, op = right, left, _FLIPPED[op]
+        if (isinstance(left, ast.Name) and isinstance(right, ast.Constant)
+                and isinstance(right.value, (int, float)) and not isinstance(right.value, bool)):
+            out.append((left.id, op, float(right.value)))
+    return out
+
+
+def initial_state(n):
+    return {
+        'observing': np.zeros(n, dtype=bool),
+        'holding': np.zeros(n, dtype=bool),
+        'buy_price': np.full(n, np.nan),
+    }
+
+
+def scan(bars, rules, state=None, start=0):
+    # -> (events DataFrame, state after the last row)
+    # state: initial_state() arrays (copied); start: first row to process,
+    # an int or one per symbol
+    screens = compile_strategy(rules)
+    n = len(bars.symbols)
+    state = {k: v.copy() for k, v in (state or initial_state(n)).items()}
+    observing, holding, buy_price = state['observing'], state['holding'], state['buy_price']
+    start = np.broadcast_to(np.asarray(start), (n,))
+
+    fields = bars.fields
+    for name, screen in screens.items():
+        unknown = screen.names - set(fields) - {'BUY_PRICE'}
+        if unknown:
+            raise screen_expr.ScreenError(f"Unknown field(s) {', '.join(sorted(unknown))} in {name}. "
+                                          f"Available: {', '.join(fields)}, BUY_PRICE")
+    # stateless rules once over the whole array, the rest per row
+    whole = {name: np.broadcast_to(screen.evaluate(fields), bars.close.shape)
+             for name, screen in screens.items() if 'BUY_PRICE' not in screen.names}
+
+    def rule(name, row):
+        if name in whole:
+            return whole[name][row]
+        env = {f: fields[f][row] for f in screens[name].names if f != 'BUY_PRICE'}
+        env['BUY_PRICE'] = buy_price
+        return screens[name].evaluate(env)
+
+    events = []
+    first = int(start.min()) if n else 0
+    for row in range(first, len(bars)):
+        active = start <= row
+
+        begin = active & ~observing & rule('observe', row)
+        buy = active & observing & ~holding & rule('entry', row)
+        observing |= begin
+        observing &= ~buy
+        holding |= buy
+        buy_price[buy] = fields['LTP'][row, buy]
+
+        sell = active & holding & rule('exit', row)
+        if buy.any() or sell.any():
+            for j in np.flatnonzero(buy):
+                events.append((row, j, 'Buy', buy_price[j]))
+            for j in np.flatnonzero(sell):
+                events.append((row, j, 'Sell', buy_price[j]))
+        holding &= ~sell
+        observing &= ~sell
+        buy_price[sell] = np.nan
+
+    return _events_frame(bars, events), state
+
+
+def _events_frame(bars, events):
+    columns = ['SYMBOL', 'ROW', 'Date', 'Action', 'Price', 'RSI', 'Ratio', 'BUY_PRICE']
+    if not events:
+        return pd.DataFrame(columns=columns)
+    rows, cols, actions, entry = zip(*events)
+    rows, cols = np.array(rows), np.array(cols)
+    out = pd.DataFrame({
+        'SYMBOL': [bars.symbols[j] for j in cols],
+        'ROW': rows,
+        'Date': [bars.date(r, j) for r, j in zip(rows, cols)],
+        'Action': actions,
+        'Price': bars.fields['LTP'][rows, cols],
+        'RSI': bars.fields['RSI'][rows, cols],
+        'Ratio': bars.fields['RATIO'][rows, cols],
+        'BUY_PRICE': entry,
+    }, columns=columns)
+    # per symbol in bar order, Buy before Sell on the same bar
+    out['_j'] = cols
+    return out.sort_values(['_j', 'ROW'], kind='mergesort').drop(columns='_j').reset_index(drop=True)
+
+
+def trades(events, **extra):
+    # events -> ledger rows as the SRT scripts write them (Buy, Sell, Profit/Loss)
+    out = []
+    for ev in events.itertuples(index=False):
+        row = {"Stock": ev.SYMBOL, "Date": ev.Date, "Action": ev.Action, "Price": ev.Price, "RSI": ev.RSI, "Ratio": ev.Ratio}
+        out.append({**row, **extra})
+        if ev.Action == 'Sell':
+            out.append({**row, "Action": "Profit/Loss", "Price": ev.Price - ev.BUY_PRICE, **extra})
+    return out
+
+
+def evaluate(df, stock_name, rules, **extra):
+    # one-shot scan of a single history, without stored state
+    events, _ = scan(from_histories({stock_name: df}), rules)
+    return trades(events, **extra)
+
+
+# ==============================
+# CLI
+# ==============================
+def _labels(symbols):
+    # panel columns are instrument keys; show trading symbols where known
+    try:
+        master = instrument_master.load_master()
+    except Exception:
+        return list(symbols)
+    names = master.set_index('instrument_key')['tradingsymbol'].str.replace('-EQ', '', regex=False)
+    names = names[~names.index.duplicated()]
+    return [names.get(s, s) for s in symbols]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a declarative entry / exit strategy over the price panel")
+    parser.add_argument('lists', nargs='*', help='restrict to symbols in these list CSVs (Symbol / SYMBOL column)')
+    parser.add_argument('--strategy', default='SRT-N200', choices=sorted(STRATEGIES))
+    for name in RULES:
+        parser.add_argument(f'--{name}', help=f'override the {name} rule')
+    parser.add_argument('--since', help='only report trades on or after this date')
+    parser.add_argument('--save', action='store_true', help='record the trades in the results store')
+    parser.add_argument('--output', help='output name in the results store (default: RULES-<strategy>)')
+    args = parser.parse_args()
+
+    panel = price_panel.open_panel()
+    if panel is None:
+        print(f"⚠️ No panel at {price_panel.PANEL_DIR}; run 'python price_panel.py build'")
+        return
+
+    rules = dict(STRATEGIES[args.strategy])
+    for name in RULES:
+        if getattr(args, name):
+            rules[name] = getattr(args, name)
+
+    labels = dict(zip(panel.symbols, _labels(panel.symbols)))
+    symbols = list(panel.symbols)
+    if args.lists:
+        wanted = set()
+        for path in args.lists:
+            df = pd.read_csv(path)
+            df.columns = df.columns.str.strip()
+            wanted.update(df['Symbol' if 'Symbol' in df else 'SYMBOL'].str.strip())
+        symbols = [s for s in symbols if labels[s] in wanted]
+
+    start = time.perf_counter()
+    bars = from_panel(panel, symbols)
+    bars.symbols = [labels[s] for s in bars.symbols]
+    events, state = scan(bars, rules)
+    elapsed = time.perf_counter() - start
+
+    ledger = pd.DataFrame(trades(events), columns=["Stock", "Date", "Action", "Price", "RSI", "Ratio"])
+    if args.since:
+        ledger = ledger[ledger['Date'] >= pd.Timestamp(args.since)]
+    print(f"🔍 {args.strategy}: {len(bars.symbols)} symbols x {len(bars)} bars in {elapsed * 1000:.0f} ms; "
+          f"{int((events['Action'] == 'Buy').sum())} buys, {int(state['holding'].sum())} open, "
+          f"{int(state['observing'].sum())} in observation")
+
+    if args.save and not ledger.empty:
+        out = ledger.assign(Date=pd.to_datetime(ledger['Date']).dt.strftime('%d-%m-%Y'))
+        results_sink.record_outputs('rule_engine', {args.output or f"RULES-{args.strategy}": out})
+    else:
+        with pd.option_context('display.width', 200, 'display.max_rows', None):
+            print(ledger.tail(40).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import glob
+import json
+import threading
+import numpy as np
+import pandas as pd
+
+import candle_store
+import trading_calendar
+
+# Per-run checkpoint journal so a retried run picks up where the last one died.
+#
+# Every finished instrument appends one JSON line {key, result} to
+# data/journal/<script>-<run key>.jsonl (flushed straight away). The run key
+# defaults to the session being screened, so a retry on the same day with
+# RESUME=1 reuses every result already in the journal and only fetches the
+# instruments that never finished. Without RESUME the journal starts empty.
+# Fetch errors are not journaled, so those instruments are retried.
+
+JOURNAL_DIR = os.path.join(candle_store.DATA_DIR, 'journal')
+KEEP_JOURNALS = 10
+
+# fetch() returns this for instruments already in the journal
+DONE = object()
+
+
+def resume_enabled():
+    return os.environ.get('RESUME', '0').strip().lower() in ('1', 'true', 'yes')
+
+
+def default_run_key():
+    key = os.environ.get('RUN_KEY', '').strip()
+    if key:
+        return key
+    return trading_calendar.default_calendar().last_session().strftime('%Y-%m-%d')
+
+
+def _encode(value):
+    if isinstance(value, pd.Timestamp):
+        return {'__ts__': value.isoformat(), 'tz': str(value.tz) if value.tz else None}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot journal {type(value).__name__}")
+
+
+def _decode(obj):
+    if set(obj) == {'__ts__', 'tz'}:
+        ts = pd.Timestamp(obj['__ts__'])
+        return ts.tz_convert(obj['tz']) if obj['tz'] else ts
+    return obj
+
+
+class RunJournal:
+
+    def __init__(self, script, run_key=None, resume=None):
+        self.script = script
+        self.run_key = run_key or default_run_key()
+        self.path = os.path.join(JOURNAL_DIR, f"{script}-{self.run_key}.jsonl")
+        self.done = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        if resume_enabled() if resume is None else resume:
+            self._replay()
+            if self.done:
+                print(f"⏭️ Resuming {script} run {self.run_key}: {len(self.done)} instrument(s) already done")
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+        self._file = open(self.path, 'a')
+        self._prune()
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line, object_hook=_decode)
+                except json.JSONDecodeError:
+                    # a line cut short by the crash; everything before it is good
+                    break
+                self.done[entry['key']] = entry['result']
+                good += len(line)
+        if good < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good)
+
+    def _prune(self):
+        journals = sorted(glob.glob(os.path.join(JOURNAL_DIR, f"{self.script}-*.jsonl")), key=os.path.getmtime)
+        for old in journals[:-KEEP_JOURNALS]:
+            if old != self.path:
+                os.remove(old)
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def get(self, key):
+        return self.done.get(key)
+
+    def record(self, key, result):
+        line = json.dumps({'key': key, 'result': result}, default=_encode)
+        with self._lock:
+            self.done[key] = result
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def main():
+    files = sorted(glob.glob(os.path.join(JOURNAL_DIR, '*.jsonl')), key=os.path.getmtime)
+    if len(sys.argv) > 1:
+        files = [f for f in files if os.path.basename(f).startswith(sys.argv[1])]
+    for path in files:
+        with open(path) as f:
+            entries = sum(1 for _ in f)
+        print(f"{os.path.basename(path)}: {entries} instrument(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import ast
+import argparse
+import operator
+import time
+import numpy as np
+from functools import lru_cache
+
+import indicators
+
+# Small screen language compiled to vectorized masks over the indicator table.
+#
+#   RSI_D < 30 and ADX_D > 25 and CLOSE > 0.95 * NEW_GTT
+#   GTT_UPDATE == "NEW ADD" or (TRIGGERED and PNL_PCT < 0)
+#
+# Names are indicator-table columns; literals are numbers, strings, True/False.
+# Supported: and / or / not, comparisons (chains allowed), + - * / and unary -.
+# Any comparison involving a missing value is False, as in pandas.
+
+
+class ScreenError(ValueError):
+    pass
+
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_CMP_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+
+# ==============================
+# COMPILER
+# ==============================
+def _compile_node(node, names):
+
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body, names)
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v, names) for v in node.values]
+        if isinstance(node.op, ast.And):
+            def run(env):
+                mask = _as_mask(parts[0](env))
+                for part in parts[1:]:
+                    mask = mask & _as_mask(part(env))
+                return mask
+        else:
+            def run(env):
+                mask = _as_mask(parts[0](env))
+                for part in parts[1:]:
+                    mask = mask | _as_mask(part(env))
+                return mask
+        return run
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand, names)
+        if isinstance(node.op, ast.Not):
+            return lambda env: ~_as_mask(operand(env))
+        if _is_text(node.operand):
+            raise ScreenError(f"Arithmetic on a string: {ast.unparse(node)}")
+        if isinstance(node.op, ast.USub):
+            text = ast.unparse(node)
+            return lambda env: -_numeric(operand(env), text)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        raise ScreenError(f"Unsupported operator: {type(node.op).__name__}")
+
+    if isinstance(node, ast.BinOp):
+        op = _BIN_OPS.get(type(node.op))
+        if op is None:
+            raise ScreenError(f"Unsupported operator: {type(node.op).__name__}")
+        if _is_text(node.left) or _is_text(node.right):
+            raise ScreenError(f"Arithmetic on a string: {ast.unparse(node)}")
+        left = _compile_node(node.left, names)
+        right = _compile_node(node.right, names)
+        text = ast.unparse(node)
+        return lambda env: op(_numeric(left(env), text), _numeric(right(env), text))
+
+    if isinstance(node, ast.Compare):
+        ops = []
+        for cmp_op in node.ops:
+            op = _CMP_OPS.get(type(cmp_op))
+            if op is None:
+                raise ScreenError(f"Unsupported comparison: {type(cmp_op).__name__}")
+            ops.append(op)
+        operands = [_compile_node(n, names) for n in [node.left] + node.comparators]
+
+        def run(env):
+            values = [f(env) for f in operands]
+            mask = _as_mask(ops[0](values[0], values[1]))
+            for i in range(1, len(ops)):
+                mask = mask & _as_mask(ops[i](values[i], values[i + 1]))
+            return mask
+        return run
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in ('True', 'False'):
+            value = name == 'True'
+            return lambda env: value
+        names.add(name)
+        return lambda env: env[name]
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float, str)):
+        value = node.value
+        return lambda env: value
+
+    raise ScreenError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def _is_text(node):
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+
+def _numeric(value, text):
+    # object columns would otherwise repeat or concatenate strings silently
+    if isinstance(value, str) or (isinstance(value, np.ndarray) and (
+            value.dtype.kind in 'US' or (value.dtype == object and any(isinstance(v, str) for v in value.flat)))):
+        raise ScreenError(f"Arithmetic on a string: {text}")
+    return value
+
+
+def _as_mask(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype == bool:
+            return value
+        if value.dtype == object:
+            return np.array([v is True or (v is not None and v == v and bool(v)) for v in value], dtype=bool)
+        return np.nan_to_num(value, nan=0.0).astype(bool)
+    return bool(value)
+
+
+class Screen:
+
+    def __init__(self, expr, fn, names):
+        self.expr = expr
+        self.fn = fn
+        self.names = frozenset(names)
+
+    def mask(self, table):
+        env = {name: _column(table, name) for name in self.names}
+        mask = self.evaluate(env)
+        if not isinstance(mask, np.ndarray):
+            mask = np.full(len(table), mask, dtype=bool)
+        return mask
+
+    def evaluate(self, env):
+        # env: {name: array}; arrays of any matching shape, e.g. dates x symbols planes
+        try:
+            return _as_mask(self.fn(env))
+        except TypeError as e:
+            # e.g. RSI_D < "a": numpy has no loop for float vs str
+            raise ScreenError(f"Type error in screen '{self.expr}': {e}") from None
+
+    def __call__(self, table):
+        return table.index[self.mask(table)]
+
+
+def _column(table, name):
+    if name not in table.columns:
+        raise ScreenError(f"Unknown column '{name}'. Available: {', '.join(table.columns)}")
+    return table[name].to_numpy()
+
+
+@lru_cache(maxsize=512)
+def compile_screen(expr):
+    try:
+        tree = ast.parse(expr.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ScreenError(f"Invalid screen '{expr}': {e.msg}") from None
+    names = set()
+    fn = _compile_node(tree, names)
+    return Screen(expr, fn, names)
+
+
+# ==============================
+# RUNNER
+# ==============================
+def run_screens(table, screens):
+    # screens: {name: expression}; every expression is compiled once and reused
+    return {name: list(compile_screen(expr)(table)) for name, expr in screens.items()}
+
+
+def read_screens_file(path):
+    screens = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if ':' in line and line.split(':', 1)[0].strip().isidentifier():
+                name, expr = line.split(':', 1)
+            else:
+                name, expr = line, line
+            screens[name.strip()] = expr.strip()
+    return screens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run screen expressions against the indicator table")
+    parser.add_argument('expr', nargs='*', help='screen expression(s)')
+    parser.add_argument('--file', help='file with one "name: expression" per line')
+    parser.add_argument('--table', default=indicators.INDICATOR_TABLE_PATH)
+    args = parser.parse_args()
+
+    screens = read_screens_file(args.file) if args.file else {}
+    for expr in args.expr:
+        screens[expr] = expr
+    if not screens:
+        parser.error('no screens given')
+
+    table = indicators.load_indicator_table(args.table)
+
+    for name, expr in screens.items():
+        start = time.perf_counter()
+        matches = list(compile_screen(expr)(table))
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"🔍 {name}: {len(matches)} match(es) in {elapsed:.2f} ms")
+        for symbol in matches:
+            print(f"   {symbol}")
+
+
+if __name__ == "__main__":
+    main()
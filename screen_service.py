@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.parse
+import urllib.request
+import numpy as np
+import pandas as pd
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import indicators
+import price_panel
+import rule_engine
+import screen_expr
+
+# Resident screening service: the price panel and indicator table are loaded
+# once and kept in memory, so screen / strategy questions are answered in
+# milliseconds instead of a full script run.
+#
+#   python screen_service.py serve [--port 8765]
+#   python screen_service.py query 'RSI_D < 30 and RATIO < 0.80'
+#   python screen_service.py query --name near_gtt
+#   python screen_service.py srt NIFTYBEES --strategy SRT-ETF
+#
+#   GET  /screen?expr=...  or  /screen?name=<screens.txt entry>
+#   GET  /symbol/<SYMBOL>                latest indicator-table row
+#   GET  /srt/<SYMBOL>[?strategy=SRT-ETF] SRT trades and current state (rule_engine.STRATEGIES)
+#   POST /bars   {"date": "...", "bars": {SYMBOL: {"Open":..,"High":..,"Low":..,"Close":..}}}
+#                                        intraday / end-of-day bars applied on top of the panel
+#   POST /reload                         pick up a rebuilt or appended panel / table
+#
+# Rows are recomputed only for symbols whose data moved on: a panel bar newer
+# than the symbol's table row (price_panel append_day from the daily job) or
+# posted bars. Indicator rows use indicators.summarize (process_stocks /
+# screener.computeRow rules) and SRT queries run the scripts' strategies through
+# rule_engine on the same history.
+
+DEFAULT_PORT = 8765
+SCREENS_PATH = 'screens.txt'
+DEFAULT_STRATEGY = 'SRT-N200'
+
+
+def _json_value(value):
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _records(df):
+    return [{k: _json_value(v) for k, v in row.items()} for row in df.reset_index().to_dict('records')]
+
+
+class ScreenState:
+
+    def __init__(self, panel_path=price_panel.PANEL_DIR, table_path=indicators.INDICATOR_TABLE_PATH,
+                 screens_path=SCREENS_PATH):
+        self.panel_path = panel_path
+        self.table_path = table_path
+        self.screens_path = screens_path
+        self.lock = threading.RLock()
+        self.panel = None
+        self.table = pd.DataFrame()
+        self.overlay = {}          # symbol -> {date: bar} posted since the last panel reload
+        self._srt = {}             # (symbol, strategy) -> SRT answer for the current history
+        self._stamps = {}
+        self.reload()
+
+    # ------------------------------
+    # loading / incremental updates
+    # ------------------------------
+    def _stamp(self, path):
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def reload(self):
+        with self.lock:
+            panel_stamp = self._stamp(os.path.join(self.panel_path, 'meta.json'))
+            table_stamp = self._stamp(self.table_path)
+
+            if table_stamp != self._stamps.get('table') and table_stamp is not None:
+                self.table = indicators.load_indicator_table(self.table_path)
+            if panel_stamp != self._stamps.get('panel') and panel_stamp is not None:
+                self.panel = price_panel.open_panel(self.panel_path)
+                self.overlay = {}
+                self._srt = {}
+            self._stamps = {'panel': panel_stamp, 'table': table_stamp}
+
+            stale = self._stale_symbols()
+            self._recompute(stale)
+            return len(stale)
+
+    def _stale_symbols(self):
+        # symbols whose last panel bar is newer than their table row
+        if self.panel is None or not len(self.panel):
+            return []
+        close = self.panel.field('Close')
+        has_bar = ~np.isnan(close)
+        last_row = len(close) - 1 - np.argmax(has_bar[::-1], axis=0)
+        last_date = np.where(has_bar.any(axis=0), self.panel.dates.values[last_row], np.datetime64('NaT'))
+        last_date = pd.Series(last_date, index=self.panel.symbols)
+
+        known = pd.to_datetime(self.table['DATE']).reindex(last_date.index) if 'DATE' in self.table else None
+        if known is None:
+            return list(last_date.index[last_date.notna()])
+        return list(last_date.index[last_date.notna() & ~(known.dt.normalize() >= last_date)])
+
+    def history(self, symbol):
+        df = self.panel.frame(symbol) if self.panel is not None and symbol in self.panel else pd.DataFrame()
+        bars = self.overlay.get(symbol)
+        if bars:
+            extra = pd.DataFrame.from_dict(bars, orient='index')
+            extra.index = pd.DatetimeIndex(extra.index)
+            df = pd.concat([df[~df.index.isin(extra.index)], extra]).sort_index()
+        return df
+
+    def _recompute(self, symbols):
+        rows = {}
+        for symbol in symbols:
+            df = self.history(symbol)
+            if df.empty:
+                continue
+            try:
+                row = indicators.summarize(df, instrument=symbol)
+            except Exception as e:
+                print(f"Error computing indicators for {symbol}: {e}")
+                continue
+            if row:
+                rows[symbol] = row
+        if not rows:
+            return
+        fresh = pd.DataFrame.from_dict(rows, orient='index')
+        fresh.index.name = 'SYMBOL'
+        table = self.table.drop(index=fresh.index, errors='ignore')
+        self.table = pd.concat([table, fresh]).sort_index()
+
+    def apply_bars(self, date, bars):
+        with self.lock:
+            day = pd.Timestamp(date).normalize()
+            for symbol, bar in bars.items():
+                self.overlay.setdefault(symbol, {})[day] = {k: float(v) for k, v in bar.items()}
+                for key in [k for k in self._srt if k[0] == symbol]:
+                    del self._srt[key]
+            self._recompute(bars.keys())
+            return len(bars)
+
+    # ------------------------------
+    # queries
+    # ------------------------------
+    def screen(self, expr=None, name=None):
+        if name is not None:
+            screens = screen_expr.read_screens_file(self.screens_path)
+            if name not in screens:
+                raise screen_expr.ScreenError(f"Unknown screen '{name}'. Available: {', '.join(screens)}")
+            expr = screens[name]
+        if expr is None or not expr.strip():
+            raise screen_expr.ScreenError("Give a screen expression (expr=...) or a saved screen name (name=...)")
+        with self.lock:
+            table = self.table
+        matches = screen_expr.compile_screen(expr)(table)
+        return {'expr': expr, 'count': len(matches), 'rows': _records(table.loc[matches])}
+
+    def symbol(self, symbol):
+        with self.lock:
+            if symbol not in self.table.index:
+                raise KeyError(symbol)
+            return {k: _json_value(v) for k, v in self.table.loc[symbol].items()}
+
+    def srt(self, symbol, strategy=DEFAULT_STRATEGY):
+        # the SRT scripts' rules (rule_engine.STRATEGIES) on the resident history
+        if strategy not in rule_engine.STRATEGIES:
+            raise screen_expr.ScreenError(f"Unknown strategy '{strategy}'. Available: {', '.join(rule_engine.STRATEGIES)}")
+
+        with self.lock:
+            if (symbol, strategy) in self._srt:
+                return self._srt[symbol, strategy]
+            df = self.history(symbol)
+        if df.empty:
+            raise KeyError(symbol)
+
+        bars = rule_engine.from_histories({symbol: df})
+        events, state = rule_engine.scan(bars, rule_engine.STRATEGIES[strategy])
+        trades = rule_engine.trades(events)
+        fields = {name: values[-1, 0] for name, values in bars.fields.items()}
+
+        holding = bool(state['holding'][0])
+        answer = {
+            'symbol': symbol,
+            'strategy': strategy,
+            'state': 'HOLDING' if holding else ('OBSERVATION' if state['observing'][0] else 'FLAT'),
+            'observing': bool(state['observing'][0]),
+            'date': _json_value(bars.indexes[0][-1]),
+            'ltp': _json_value(fields['LTP']),
+            'rsi': _json_value(fields['RSI']),
+            'ratio': _json_value(fields['RATIO']),
+            'buy_price': _json_value(state['buy_price'][0]) if holding else None,
+            'trades': [{k: _json_value(v) for k, v in t.items()} for t in trades],
+        }
+        with self.lock:
+            self._srt[symbol, strategy] = answer
+        return answer
+
+
+# ==============================
+# HTTP
+# ==============================
+def make_handler(state):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, status, payload, started):
+            payload['ms'] = round((time.perf_counter() - started) * 1000, 2)
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _dispatch(self, method):
+            started = time.perf_counter()
+            url = urllib.parse.urlparse(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            parts = [urllib.parse.unquote(p) for p in url.path.strip('/').split('/') if p]
+            try:
+                if method == 'GET' and parts == ['screen']:
+                    payload = state.screen(query.get('expr'), query.get('name'))
+                elif method == 'GET' and len(parts) == 2 and parts[0] == 'symbol':
+                    payload = state.symbol(parts[1])
+                elif method == 'GET' and len(parts) == 2 and parts[0] == 'srt':
+                    payload = state.srt(parts[1], query.get('strategy', DEFAULT_STRATEGY))
+                elif method == 'GET' and parts == ['health']:
+                    payload = {'symbols': len(state.table), 'panel_dates': len(state.panel) if state.panel is not None else 0}
+                elif method == 'POST' and parts == ['bars']:
+                    body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                    payload = {'updated': state.apply_bars(body['date'], body['bars'])}
+                elif method == 'POST' and parts == ['reload']:
+                    payload = {'updated': state.reload()}
+                else:
+                    return self._send(404, {'error': f"No route for {method} {url.path}"}, started)
+            except screen_expr.ScreenError as e:
+                return self._send(400, {'error': str(e)}, started)
+            except KeyError as e:
+                return self._send(404, {'error': f"Unknown symbol or field {e}"}, started)
+            except Exception as e:
+                return self._send(500, {'error': str(e)}, started)
+            self._send(200, payload, started)
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=DEFAULT_PORT, reload_every=60):
+    state = ScreenState()
+    print(f"✅ Loaded {len(state.table)} symbols, {len(state.panel) if state.panel is not None else 0} panel dates")
+
+    def watch():
+        # pick up the daily job's panel / table updates without a restart
+        while True:
+            time.sleep(reload_every)
+            try:
+                n = state.reload()
+                if n:
+                    print(f"🔄 Recomputed {n} symbol(s)")
+            except Exception as e:
+                print(f"⚠️ Reload failed: {e}")
+
+    threading.Thread(target=watch, daemon=True).start()
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    print(f"🔍 Screening service on http://127.0.0.1:{port}")
+    server.serve_forever()
+
+
+def _get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as res:
+            return json.load(res)
+    except urllib.error.HTTPError as e:
+        return json.load(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident screening service")
+    sub = parser.add_subparsers(dest='command', required=True)
+    srv = sub.add_parser('serve')
+    srv.add_argument('--port', type=int, default=DEFAULT_PORT)
+    srv.add_argument('--reload-every', type=int, default=60, help='seconds between panel / table checks')
+    q = sub.add_parser('query')
+    q.add_argument('expr', nargs='?')
+    q.add_argument('--name', help='screen name from screens.txt')
+    q.add_argument('--port', type=int, default=DEFAULT_PORT)
+    s = sub.add_parser('srt')
+    s.add_argument('symbol')
+    s.add_argument('--strategy', default=DEFAULT_STRATEGY, choices=sorted(rule_engine.STRATEGIES))
+    s.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.port, args.reload_every)
+        return
+
+    if args.command == 'query':
+        params = {'name': args.name} if args.name else {'expr': args.expr or ''}
+        result = _get(args.port, '/screen?' + urllib.parse.urlencode(params))
+        if 'error' in result:
+            print(f"❌ {result['error']}")
+            sys.exit(1)
+        print(f"🔍 {result['expr']}: {result['count']} match(es) in {result['ms']} ms")
+        for row in result['rows']:
+            print(f"   {row['SYMBOL']}")
+    else:
+        result = _get(args.port, '/srt/' + urllib.parse.quote(args.symbol) + '?' + urllib.parse.urlencode({'strategy': args.strategy}))
+        print(json.dumps(result, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,27 @@
 import os
 import pandas as pd
-import urllib.parse
 import pytz
-import requests
 from datetime import datetime, timedelta
 import ta
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
+import sys
+import fetch_health
+import extrema_index
+import fetch_planner
+import instrument_master
+import trading_calendar
+import results_sink
+import pipeline
+import run_journal
 
 
 
 TIME_ZONE = pytz.timezone('Asia/Kolkata')
 
+if trading_calendar.skip_run():
+    sys.exit(0)
+
 # --- STEP 1: AUTHENTICATE WITH GOOGLE SHEETS ---
 def authenticate_gsheet():
     # Write credentials JSON from GitHub Secret to file
@@ -19,11 +29,9 @@ def authenticate_gsheet():
         f.write(os.environ['GCP_CREDS_JSON'])
 
 
-# Load symbols
-fileUrl = 'https://assets.upstox.com/market-quote/instruments/exchange/complete.csv.gz'
-symboldf = pd.read_csv(fileUrl)
+# Load symbols (NSE_EQ rows of the Upstox instrument master, cached locally)
+symboldf = instrument_master.load_master()
 symboldf['expiry'] = pd.to_datetime(symboldf['expiry']).apply(lambda x: x.date())
-symboldf = symboldf[symboldf.exchange == 'NSE_EQ']
 
 # Load ISIN lists
 nifty_50 = pd.read_csv('ind_nifty50list.csv')
@@ -54,65 +62,59 @@ nifty_200_df = nifty_200_df.loc[~nifty_200_df.instrument_key.isin(exclude_keys)]
 
 
 
-def getHistoricalData(symInfo):
-    try:
-        parseInstrument = urllib.parse.quote(symInfo.instrument_key)
-        fromDate = (datetime.now(TIME_ZONE) - timedelta(days=10000)).strftime("%Y-%m-%d")
-        toDate = (datetime.now(TIME_ZONE)+ timedelta(days=1)).strftime("%Y-%m-%d")
+def fetchCandles(symInfo):
+    fromDate = (datetime.now(TIME_ZONE) - timedelta(days=10000)).strftime("%Y-%m-%d")
+    candles = fetch_planner.sync_daily_candles(symInfo.instrument_key, fromDate)
 
-        url = f'https://api.upstox.com/v2/historical-candle/{parseInstrument}/day/{toDate}/{fromDate}'
+    if candles.empty:
+        print(f'No candles for {symInfo.instrument_key}')
+        return None
 
-        res = requests.get(url, headers={'accept': 'application/json'}, params={}, timeout=5.0)
-        candleRes = res.json()
+    return candles.rename(columns={'Volume': 'vol', 'OI': 'oi'})
 
-        if 'data' in candleRes and 'candles' in candleRes['data'] and candleRes['data']['candles']:
-            hist = pd.DataFrame(candleRes['data']['candles'])
-            hist.columns = ['date', 'Open', 'High', 'Low', 'Close', 'vol', 'oi']
-            hist['date'] = pd.to_datetime(hist['date'])
-            hist.set_index('date', inplace=True)
 
+def computeRow(symInfo, hist):
+    try:
         hist.sort_values(by="date", ascending=True,inplace=True)    
         # Calculate 52-week high and low
-        high_52w = hist['High'].max()
-        low_52w = hist['Low'].min()
-        high_52w_date = hist['High'].idxmax()
-        low_52w_date = hist['Low'].idxmin()
+        idx = extrema_index.ExtremaIndex(hist['High'], hist['Low'])
+        last = len(hist) - 1
+        high_52w, high_52w_date = idx.high_in(0, len(hist))
+        low_52w, low_52w_date = idx.low_in(0, len(hist))
 
         # Convert dates to strings for output
         high_52w_date_str = high_52w_date.strftime('%d-%b-%Y')
         low_52w_date_str = low_52w_date.strftime('%d-%b-%Y')
 
-        # Calculate 20-day low and high
-        hist['20d Low'] = hist['Low'].rolling(window=20).min()
-        hist['20d High'] = hist['High'].rolling(window=20).max()
-
-        # Calculate previous day's 20-day high for each day
-        hist['Prev Day 20D High'] = hist['20d High'].shift(1)
+        # Today's 20-day high and the previous day's 20-day high
+        high_20d = idx.rolling_max(last, 20)
+        prev_high_20d = idx.rolling_max(last - 1, 20)
 
         # Find the date and price of the 20-day low
-        low_touch_dates = hist[hist['Low'] == hist['20d Low']].index
-        if not low_touch_dates.empty:
-            last_20d_low_date = low_touch_dates[-1]
-            last_20d_low_price = hist.loc[last_20d_low_date, 'Low']
+        low_pos = idx.last_low_touch(20)
+        if low_pos is not None:
+            last_20d_low_date = hist.index[low_pos]
+            last_20d_low_price = idx.low[low_pos]
             last_20d_low_date_str = last_20d_low_date.strftime('%d-%b-%Y')
             last_20d_low_price_str = f"{last_20d_low_price:.2f}"
         else:
+            last_20d_low_date = None
             last_20d_low_date_str = None
             last_20d_low_price_str = None
 
         # Find the date when the previous day's 20-day high was first touched after the 20-day low date
         first_high_touched_price = None
         if last_20d_low_date:
-            subsequent_high_dates = hist[hist.index > last_20d_low_date]
-            first_high_touched_dates = subsequent_high_dates[subsequent_high_dates['High'] >= subsequent_high_dates['Prev Day 20D High']]
+            hit = idx.first_breakout(low_pos, 20)
 
-            if not first_high_touched_dates.empty:
-                first_high_touched_date = first_high_touched_dates.index[0]
+            if hit is not None:
+                first_high_touched_date = hist.index[hit]
+                trigger_price = idx.rolling_max(hit - 1, 20)
                 first_high_touched_date_str = first_high_touched_date.strftime('%d-%b-%Y')
 
                 # Get the closing price on the day when the first high was touched
                 first_high_touched_price = hist.loc[first_high_touched_date, 'Close']
-                first_high_touched_prev_day_20d_high_str = f"{hist.loc[first_high_touched_date, 'Prev Day 20D High']:.2f}"
+                first_high_touched_prev_day_20d_high_str = f"{trigger_price:.2f}"
             else:
                 first_high_touched_date_str = None
                 first_high_touched_prev_day_20d_high_str = None
@@ -126,14 +128,14 @@ def getHistoricalData(symInfo):
 
         # Calculate %DIFF
         percent_diff_str = None
-        if first_high_touched_date_str is None and last_close_price and hist['20d High'].iloc[-1]:
-            percent_diff = ((hist['20d High'].iloc[-1] - last_close_price) / last_close_price) * 100
+        if first_high_touched_date_str is None and last_close_price and high_20d:
+            percent_diff = ((high_20d - last_close_price) / last_close_price) * 100
             percent_diff_str = f"{percent_diff:.2f}"
 
         # Calculate P&L %
         pnl_percent_str = None
         if first_high_touched_prev_day_20d_high_str is not None and first_high_touched_price is not None:
-            pnl_percent = ((last_close_price - hist.loc[first_high_touched_date, 'Prev Day 20D High']) / hist.loc[first_high_touched_date, 'Prev Day 20D High']) * 100
+            pnl_percent = ((last_close_price - trigger_price) / trigger_price) * 100
             pnl_percent_str = f"{pnl_percent:.2f}"
         else:
             pnl_percent_str = None
@@ -161,17 +163,17 @@ def getHistoricalData(symInfo):
         if first_high_touched_date_str is not None:
             gtt_update = "TRIGGERED"
 
-        elif hist['Prev Day 20D High'].iloc[-1] != hist['20d High'].iloc[-1]:
+        elif prev_high_20d != high_20d:
             gtt_update = "YES"
-        elif datetime.today().date() == last_20d_low_date.date():
+        elif last_20d_low_date is not None and trading_calendar.default_calendar().last_session().date() == last_20d_low_date.date():
             gtt_update = "NEW ADD"
 
         return {
             'Stock': symInfo.tradingsymbol	,
             '20D LOW DATE': last_20d_low_date_str,
             '20D LOW': last_20d_low_price_str,
-            'OLD GTT': f"{hist['Prev Day 20D High'].iloc[-1]:.2f}" if not hist['Prev Day 20D High'].empty else None,
-            'NEW GTT': f"{hist['20d High'].iloc[-1]:.2f}" if not hist['20d High'].empty else None,
+            'OLD GTT': f"{prev_high_20d:.2f}",
+            'NEW GTT': f"{high_20d:.2f}",
             'CLOSE': last_close_price_str,  # Add the last close price column
             '%DIFF': percent_diff_str,  # Add %DIFF column
             'GTT Update': gtt_update,  # Add a blank column for GTT updates
@@ -186,28 +188,15 @@ def getHistoricalData(symInfo):
 
 
     except Exception as e:
-        print(f'Error in data fetch for {symInfo.instrument_key}: {e}')
+        print(f'Error computing {symInfo.instrument_key}: {e}')
         return None
 
-def process_data(df):
-    results = []
-    for _, row in df.iterrows():
-        result = getHistoricalData(row)
-        if result:
-            results.append(result)
-    return pd.DataFrame(results)
-
-
-# Process data for Nifty 50 and Nifty 100 separately
-nifty_50_results_df = process_data(nifty_50_df)
-nifty_100_results_df = process_data(nifty_100_df)
-nifty_200_results_df = process_data(nifty_200_df)
-
-
-# Authenticate with Google Sheets
-scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-creds = ServiceAccountCredentials.from_json_keyfile_name(r'credentials.json', scope)
-client = gspread.authorize(creds)
+# Authenticate with Google Sheets (only needed when publishing)
+client = None
+if results_sink.publish_enabled():
+    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+    creds = ServiceAccountCredentials.from_json_keyfile_name(r'credentials.json', scope)
+    client = gspread.authorize(creds)
 
 def update_sheet(file_name, df, sheet_name):
     try:
@@ -263,7 +252,49 @@ def update_sheet(file_name, df, sheet_name):
 
 
 
+def publish_slice(run_id, universe_df, sheet_name, rows):
+    # Keep the index-list order within the slice (the schedule fetches healthy
+    # instruments first and leaves quarantined ones out)
+    position = {key: i for i, key in enumerate(universe_df.instrument_key)}
+    rows = sorted(rows, key=lambda r: position[r[0]])
+    df = pd.DataFrame([row for _, row in rows])
+
+    results_sink.record_output(run_id, sheet_name, df)
+    if results_sink.publish_enabled():
+        update_sheet("SST WITH RSI AND RS  BY MILAN upstock", df, sheet_name)
+
+
 if __name__ == "__main__":
-    update_sheet("SST WITH RSI AND RS  BY MILAN upstock", process_data(nifty_50_df), "SST-N50")
-    update_sheet("SST WITH RSI AND RS  BY MILAN upstock", process_data(nifty_100_df), "SST-N100")
-    update_sheet("SST WITH RSI AND RS  BY MILAN upstock", process_data(nifty_200_df), "SST-N200")
+    # Nifty 50, Next 50 and the rest of Nifty 200 stream through one pipeline:
+    # candles are fetched while earlier symbols are computed, and each slice is
+    # written as soon as its last symbol is done.
+    universes = {"SST-N50": nifty_50_df, "SST-N100": nifty_100_df, "SST-N200": nifty_200_df}
+    groups = [(name, [row for _, row in fetch_health.schedule_frame(df).iterrows()]) for name, df in universes.items()]
+
+    # RESUME=1 reuses rows journaled by an earlier attempt at the same session
+    journal = run_journal.RunJournal("screener")
+
+    def fetch(symInfo):
+        if symInfo.instrument_key in journal:
+            return run_journal.DONE
+        return fetchCandles(symInfo)
+
+    def compute(symInfo, hist):
+        if hist is run_journal.DONE:
+            row = journal.get(symInfo.instrument_key)
+        else:
+            row = computeRow(symInfo, hist)
+            if row is not None:
+                journal.record(symInfo.instrument_key, row)
+        return (symInfo.instrument_key, row) if row else None
+
+    run_id = results_sink.open_run("screener")
+    errors = pipeline.run_pipeline(
+        groups,
+        fetch=fetch,
+        compute=compute,
+        publish=lambda name, rows: publish_slice(run_id, universes[name], name, rows),
+        fetch_workers=4,
+    )
+    results_sink.close_run(run_id, 'ok' if not errors else f'{len(errors)} error(s)')
+    journal.close()
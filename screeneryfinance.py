@@ -6,6 +6,10 @@ import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pytz
 import ta
+import results_sink
+import sys
+import trading_calendar
+import extrema_index
 
 # Authenticate Google Sheets
 def authenticate_gsheet():
@@ -27,13 +31,13 @@ def process_stocks(stocks):
 
     for stock in stocks:
         try:
-            df = hist[stock].copy()
+            df = hist[stock].dropna(how='all').copy()
             df.reset_index(inplace=True)
             df.sort_values('Date', inplace=True)
 
-            df['20D_Low'] = df['Low'].rolling(window=20).min()
-            df['20D_High'] = df['High'].rolling(window=20).max()
-            df['Prev_20D_High'] = df['20D_High'].shift(1)
+            # 20D / 52W extremes and their dates from one range-extrema index
+            idx = extrema_index.ExtremaIndex(df['High'], df['Low'], pd.DatetimeIndex(df['Date']))
+            last = len(df) - 1
 
             # RSI Daily
             df['RSI_D'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
@@ -49,29 +53,26 @@ def process_stocks(stocks):
             prev_close = df['Close'].iloc[-2] if len(df) >= 2 else None
             today_change = ((today_close - prev_close) / prev_close) * 100 if prev_close else None
 
-            old_gtt = df['Prev_20D_High'].iloc[-1]
-            new_gtt = df['20D_High'].iloc[-1]
+            old_gtt = idx.rolling_max(last - 1, 20)
+            new_gtt = idx.rolling_max(last, 20)
 
-            mask_20d_low = df['Low'] == df['20D_Low']
-            latest_20d_low_date = df.loc[mask_20d_low, 'Date'].max()
-            latest_20d_low_price = df.loc[df['Date'] == latest_20d_low_date, 'Low'].values[0] if pd.notnull(latest_20d_low_date) else None
+            low_pos = idx.last_low_touch(20)
+            latest_20d_low_date = df['Date'].iloc[low_pos] if low_pos is not None else pd.NaT
+            latest_20d_low_price = idx.low[low_pos] if low_pos is not None else None
 
-            df_1y = df[df['Date'] >= (end_date - timedelta(days=365))]
-            high_52w = df_1y['High'].max()
-            high_52w_date = df_1y[df_1y['High'] == high_52w]['Date'].values[0]
-            low_52w = df_1y['Low'].min()
-            low_52w_date = df_1y[df_1y['Low'] == low_52w]['Date'].values[0]
+            start, stop = idx.since(end_date - timedelta(days=365))
+            high_52w, high_52w_date = idx.high_in(start, stop)
+            low_52w, low_52w_date = idx.low_in(start, stop)
 
             boh_eligible = "YES" if low_52w_date > high_52w_date else ""
 
             trigger_date = None
             gtt_trigger_price = None
-            if pd.notnull(latest_20d_low_date):
-                df_after_low = df[df['Date'] > latest_20d_low_date].copy()
-                df_after_low = df_after_low[df_after_low['High'] >= df_after_low['Prev_20D_High']]
-                if not df_after_low.empty:
-                    trigger_date = df_after_low.iloc[0]['Date']
-                    gtt_trigger_price = df_after_low.iloc[0]['Prev_20D_High']
+            if low_pos is not None:
+                hit = idx.first_breakout(low_pos, 20)
+                if hit is not None:
+                    trigger_date = df['Date'].iloc[hit]
+                    gtt_trigger_price = idx.rolling_max(hit - 1, 20)
 
             pnl_percent = None
             if trigger_date and gtt_trigger_price:
@@ -81,7 +82,7 @@ def process_stocks(stocks):
             if not trigger_date and new_gtt and today_close:
                 percent_diff = ((new_gtt - today_close) / today_close) * 100
 
-            today_str = end_date.strftime('%d-%b-%Y')
+            today_str = trading_calendar.default_calendar().last_session().strftime('%d-%b-%Y')
             latest_20d_low_date_str = latest_20d_low_date.strftime('%d-%b-%Y') if pd.notnull(latest_20d_low_date) else None
             trigger_date_str = trigger_date.strftime('%d-%b-%Y') if pd.notnull(trigger_date) else None
 
@@ -129,7 +130,10 @@ nifty50 = [s + ".NS" for s in nifty50]
 nifty100 = [s + ".NS" for s in nifty100]
 nifty200 = [s + ".NS" for s in nifty200]
 
-client = authenticate_gsheet()
+if trading_calendar.skip_run():
+    sys.exit(0)
+
+client = authenticate_gsheet() if results_sink.publish_enabled() else None
 
 # Update Google Sheet
 def update_sheet(file_name, df, sheet_name):
@@ -160,6 +164,13 @@ df_nifty50 = process_stocks(nifty50)
 df_nifty100 = process_stocks(nifty100)
 df_nifty200 = process_stocks(nifty200)
 
-update_sheet('SST WITH RSI AND RS  BY MILAN YFINACE', df_nifty50, 'SST-N50')
-update_sheet('SST WITH RSI AND RS  BY MILAN YFINACE', df_nifty100, 'SST-N100')
-update_sheet('SST WITH RSI AND RS  BY MILAN YFINACE', df_nifty200, 'SST-N200')
+results_sink.record_outputs('screeneryfinance', {
+    'SST-N50': df_nifty50,
+    'SST-N100': df_nifty100,
+    'SST-N200': df_nifty200,
+})
+
+if results_sink.publish_enabled():
+    update_sheet('SST WITH RSI AND RS  BY MILAN YFINACE', df_nifty50, 'SST-N50')
+    update_sheet('SST WITH RSI AND RS  BY MILAN YFINACE', df_nifty100, 'SST-N100')
+    update_sheet('SST WITH RSI AND RS  BY MILAN YFINACE', df_nifty200, 'SST-N200')
@@ -0,0 +1,86 @@
+import argparse
+import pandas as pd
+
+import indicators
+import results_sink
+import screen_expr
+
+# Industry breadth over the indicator table.
+#
+# Each measure is a screen expression; its mask over the whole table is
+# computed once and averaged per Industry (from the ind_nifty*list.csv files)
+# in a single groupby, together with the median of a few indicator columns.
+# Stocks missing a value (e.g. under 124 bars for RATIO) count as not matching,
+# the same as in screens.
+
+MEASURES = {
+    'ABOVE_124DMA': 'RATIO > 1',
+    'SRT_OBSERVATION': 'RSI_D < 30 and RATIO < 0.80',
+    'NEAR_20D_HIGH': 'CLOSE >= 0.98 * HIGH_20D',
+    'GTT_TRIGGERED': 'TRIGGERED',
+    'RSI_ABOVE_50': 'RSI_D > 50',
+}
+
+MEDIANS = ['RSI_D', 'RATIO', 'CHANGE_PCT']
+
+ALL_INDUSTRIES = 'ALL'
+
+
+def load_industries(lists):
+    frames = []
+    for path in lists:
+        df = pd.read_csv(path)
+        df.columns = df.columns.str.strip()
+        frames.append(df[['Symbol', 'Industry']])
+    df = pd.concat(frames).drop_duplicates(subset='Symbol')
+    return pd.Series(df['Industry'].str.strip().values, index=df['Symbol'].str.strip(), name='Industry')
+
+
+def breadth(table, industries, measures=None):
+
+    measures = measures or MEASURES
+    table = table[table.index.isin(industries.index)]
+
+    flags = pd.DataFrame(
+        {f"{name}_PCT": screen_expr.compile_screen(expr).mask(table) for name, expr in measures.items()},
+        index=table.index,
+    ).astype(float) * 100
+    values = table.reindex(columns=MEDIANS).astype(float)
+    industry = industries.reindex(table.index)
+
+    grouped = pd.concat([flags, values], axis=1).groupby(industry)
+    out = grouped[list(flags.columns)].mean()
+    out[[f"MEDIAN_{c}" for c in MEDIANS]] = grouped[MEDIANS].median().to_numpy()
+    out.insert(0, 'STOCKS', grouped.size())
+
+    total = pd.concat([flags.mean(), values.median().add_prefix('MEDIAN_')])
+    total['STOCKS'] = len(table)
+    out.loc[ALL_INDUSTRIES] = total[out.columns]
+
+    out['STOCKS'] = out['STOCKS'].astype(int)
+    out.index.name = 'INDUSTRY'
+    return out.round(2).sort_values('STOCKS', ascending=False, kind='mergesort')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Industry breadth over the indicator table")
+    parser.add_argument('lists', nargs='*', default=['ind_nifty200list.csv'], help='index list CSVs with Symbol and Industry')
+    parser.add_argument('--table', default=indicators.INDICATOR_TABLE_PATH)
+    parser.add_argument('--file', help='breadth measures as "name: expression" lines (default: built-in set)')
+    parser.add_argument('--output', default='BREADTH-N200', help='output name in the results store')
+    parser.add_argument('--save', action='store_true', help='record the breadth table in the results store')
+    args = parser.parse_args()
+
+    table = indicators.load_indicator_table(args.table)
+    measures = screen_expr.read_screens_file(args.file) if args.file else None
+    out = breadth(table, load_industries(args.lists), measures)
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(out.to_string())
+
+    if args.save:
+        results_sink.record_outputs('sector_breadth', {args.output: out.reset_index()})
+
+
+if __name__ == "__main__":
+    main()
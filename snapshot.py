@@ -0,0 +1,183 @@
+import os
+import io
+import json
+import glob
+import shutil
+import sqlite3
+import tarfile
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+
+import candle_store
+import indicators
+import price_panel
+import results_sink
+
+# One-file snapshot of the local data directory for fresh CI runners.
+#
+#   python snapshot.py export [--with-results]   -> data/snapshot-YYYYMMDD.tar.gz (+ .sha256)
+#   python snapshot.py import SNAPSHOT            -> restores into SCREENER_DATA_DIR
+#
+# The archive holds manifest.json (format version, creation time, sha256 and
+# size of every member), a consistent copy of market.db (candles, corporate
+# actions, fetch state, instrument master) taken with VACUUM INTO, the price
+# panels, the indicator table and the per-instrument indicator cache.
+# Import verifies the archive checksum and every member before anything in the
+# data directory is replaced, so a bad download never leaves a half-restored
+# store; restoring is a file copy, and the next run only fetches the delta.
+
+SNAPSHOT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _rel(path):
+    return os.path.relpath(path, candle_store.DATA_DIR)
+
+
+def _sqlite_copy(src, dest):
+    # VACUUM INTO gives a compact, consistent copy even while WAL is in use
+    conn = sqlite3.connect(src)
+    try:
+        conn.execute('VACUUM INTO ?', (dest,))
+    finally:
+        conn.close()
+
+
+# ==============================
+# EXPORT
+# ==============================
+def _members(with_results):
+    files = []
+    for panel_dir in (price_panel.PANEL_DIR, price_panel.YF_PANEL_DIR):
+        if os.path.exists(panel_dir):
+            files += sorted(glob.glob(os.path.join(panel_dir, '*')))
+    if os.path.exists(indicators.INDICATOR_TABLE_PATH):
+        files.append(indicators.INDICATOR_TABLE_PATH)
+    files += sorted(glob.glob(os.path.join(indicators.INDICATOR_CACHE_DIR, '*.pkl')))
+
+    databases = [candle_store.DB_PATH]
+    if with_results:
+        databases.append(results_sink.RESULTS_DB_PATH)
+    return [d for d in databases if os.path.exists(d)], files
+
+
+def export_snapshot(path=None, with_results=False, compresslevel=6):
+
+    path = path or os.path.join(candle_store.DATA_DIR, f"snapshot-{datetime.now():%Y%m%d}.tar.gz")
+    databases, files = _members(with_results)
+    if not databases:
+        raise FileNotFoundError(f"No market store at {candle_store.DB_PATH}")
+
+    manifest = {'version': SNAPSHOT_VERSION, 'created': datetime.now().isoformat(timespec='seconds'), 'files': {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        members = []
+        for db in databases:
+            copy = os.path.join(tmp, os.path.basename(db))
+            _sqlite_copy(db, copy)
+            members.append((copy, _rel(db)))
+        members += [(f, _rel(f)) for f in files]
+
+        for src, name in members:
+            manifest['files'][name] = {'sha256': _sha256(src), 'size': os.path.getsize(src)}
+
+        tmp_path = path + '.tmp'
+        with tarfile.open(tmp_path, 'w:gz', compresslevel=compresslevel) as tar:
+            data = json.dumps(manifest, indent=1).encode()
+            info = tarfile.TarInfo(MANIFEST)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            for src, name in members:
+                tar.add(src, arcname=name)
+        os.replace(tmp_path, path)
+
+    with open(path + '.sha256', 'w') as f:
+        f.write(f"{_sha256(path)}  {os.path.basename(path)}\n")
+    return path, manifest
+
+
+# ==============================
+# IMPORT
+# ==============================
+def _expected_checksum(path):
+    sidecar = path + '.sha256'
+    if not os.path.exists(sidecar):
+        return None
+    with open(sidecar) as f:
+        return f.read().split()[0]
+
+
+def import_snapshot(path, dest=None):
+
+    dest = dest or candle_store.DATA_DIR
+    expected = _expected_checksum(path)
+    if expected and _sha256(path) != expected:
+        raise SnapshotError(f"{path}: archive checksum mismatch")
+
+    os.makedirs(dest, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=dest) as tmp:
+        with tarfile.open(path, 'r:gz') as tar:
+            try:
+                manifest = json.load(tar.extractfile(MANIFEST))
+            except KeyError:
+                raise SnapshotError(f"{path}: no {MANIFEST}") from None
+            if manifest.get('version', 0) > SNAPSHOT_VERSION:
+                raise SnapshotError(f"{path}: snapshot version {manifest['version']} is newer than {SNAPSHOT_VERSION}")
+            names = set(manifest['files'])
+            tar.extractall(tmp, members=[m for m in tar.getmembers() if m.name in names], filter='data')
+
+        for name, meta in manifest['files'].items():
+            extracted = os.path.join(tmp, name)
+            if not os.path.exists(extracted) or _sha256(extracted) != meta['sha256']:
+                raise SnapshotError(f"{path}: {name} failed verification")
+
+        # everything checks out; move files into place
+        for name in manifest['files']:
+            target = os.path.join(dest, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if target.endswith('.db'):
+                for suffix in ('-wal', '-shm'):
+                    if os.path.exists(target + suffix):
+                        os.remove(target + suffix)
+            shutil.move(os.path.join(tmp, name), target)
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export / import a local data snapshot")
+    sub = parser.add_subparsers(dest='command', required=True)
+    exp = sub.add_parser('export')
+    exp.add_argument('path', nargs='?')
+    exp.add_argument('--with-results', action='store_true', help='include results.db')
+    imp = sub.add_parser('import')
+    imp.add_argument('path')
+    args = parser.parse_args()
+
+    start = datetime.now()
+    if args.command == 'export':
+        path, manifest = export_snapshot(args.path, args.with_results)
+        size = os.path.getsize(path) / 1e6
+        print(f"📦 {len(manifest['files'])} file(s) -> {path} ({size:.1f} MB) in {(datetime.now() - start).total_seconds():.1f}s")
+    else:
+        manifest = import_snapshot(args.path)
+        print(f"✅ Restored {len(manifest['files'])} file(s) from {manifest['created']} into {candle_store.DATA_DIR} "
+              f"in {(datetime.now() - start).total_seconds():.1f}s")
+
+
+if __name__ == "__main__":
+    main()
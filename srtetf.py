@@ -1,15 +1,17 @@
 import pandas as pd
-import urllib.parse
 import pytz
-import requests
-import ta
+import results_sink
+import strategy_state
 import os
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from gspread.utils import rowcol_to_a1
 from tqdm import tqdm
+import fetch_health
+import fetch_planner
+import instrument_master
+import pipeline
+import trading_calendar
 
 TIME_ZONE = pytz.timezone('Asia/Kolkata')
 
@@ -32,9 +34,7 @@ def authenticate_gsheet():
 # ==============================
 def load_symbols():
 
-    symbol_url = 'https://assets.upstox.com/market-quote/instruments/exchange/complete.csv.gz'
-    symboldf = pd.read_csv(symbol_url)
-    symboldf = symboldf[symboldf.exchange == 'NSE_EQ']
+    symboldf = instrument_master.load_master()
 
     mw_df = pd.read_csv('ETF.csv')
     mw_df.columns = mw_df.columns.str.strip()
@@ -54,123 +54,28 @@ def load_symbols():
 def fetch_historical_candle_data(instrument_key):
 
     try:
-        encoded_key = urllib.parse.quote(instrument_key)
+        df = fetch_planner.sync_daily_candles(instrument_key, "2024-10-01")
 
-        from_date = "2024-10-01"
-        to_date = (datetime.now(TIME_ZONE) + timedelta(days=1)).strftime("%Y-%m-%d")
-
-        url = f'https://api.upstox.com/v2/historical-candle/{encoded_key}/day/{to_date}/{from_date}'
-
-        res = requests.get(url, headers={'accept': 'application/json'}, timeout=5.0)
-        data = res.json()
-
-        if 'data' not in data:
+        if df.empty:
             return None
 
-        df = pd.DataFrame(data['data']['candles'])
-        df.columns = ['date', 'Open', 'High', 'Low', 'Close', 'Volume', 'OI']
-        df['date'] = pd.to_datetime(df['date'])
-        df.set_index('date', inplace=True)
-        df.sort_index(inplace=True)
-
         return df
 
-    except:
+    except Exception as e:
+        print(f"Error fetching {instrument_key}: {e}")
         return None
 
 
-# ==============================
-# INDICATORS
-# ==============================
-def prepare_indicators(df):
-
-    df['LTP'] = df['Close']
-    df['124DMA'] = df['LTP'].rolling(124).mean()
-    df['Ratio'] = df['LTP'] / df['124DMA']
-    df['RSI'] = ta.momentum.RSIIndicator(df['LTP']).rsi()
-
-    return df
-
-
 # ==============================
 # STRATEGY
 # ==============================
-def evaluate_strategy(df, stock_name, underlying):
-
-    trades = []
-    buy_price = None
-    in_observation = False
-
-    for i in range(len(df)):
-
-        date = df.index[i]
-        row = df.iloc[i]
-
-        rsi = row['RSI']
-        ratio = row['Ratio']
-        ltp = row['LTP']
-
-        if not in_observation and rsi < 35 and ratio < 0.95:
-            in_observation = True
-
-        elif in_observation and rsi > 35 and buy_price is None:
-            buy_price = ltp
-            trades.append({
-                "Stock": stock_name,
-                "Date": date,
-                "Action": "Buy",
-                "Price": ltp,
-                "RSI": rsi,
-                "Ratio": ratio,
-                "Underlying": underlying
-            })
-            in_observation = False
-
-        if buy_price and (ratio > 1.30 or rsi > 75 or ltp < 0.75 * buy_price):
-
-            trades.append({
-                "Stock": stock_name,
-                "Date": date,
-                "Action": "Sell",
-                "Price": ltp,
-                "RSI": rsi,
-                "Ratio": ratio,
-                "Underlying": underlying
-            })
-
-            trades.append({
-                "Stock": stock_name,
-                "Date": date,
-                "Action": "Profit/Loss",
-                "Price": ltp - buy_price,
-                "RSI": rsi,
-                "Ratio": ratio,
-                "Underlying": underlying
-            })
-
-            buy_price = None
-            in_observation = False
-
-    return trades
-
-
-# ==============================
-# PROCESS SINGLE STOCK
-# ==============================
-def process_stock(row):
+def compute_stock(row, df):
 
     stock = row['tradingsymbol']
-    inst_key = row['instrument_key']
     underlying = row['name']
 
-    df = fetch_historical_candle_data(inst_key)
-
-    if df is None or df.empty:
-        return []
-
-    df = prepare_indicators(df)
-
-    return evaluate_strategy(df, stock, underlying)
+    # advances the stored SRT-ETF state over new bars (own connection per worker call)
+    return strategy_state.evaluate('SRT-ETF', df, stock, Underlying=underlying)
 
 
 # ==============================
@@ -202,23 +107,30 @@ def update_sheet(df, client):
 # ==============================
 def main():
 
-    client = authenticate_gsheet()
+    if trading_calendar.skip_run():
+        return
+
+    client = authenticate_gsheet() if results_sink.publish_enabled() else None
     symbols_df = load_symbols()
 
-    all_trades = []
+    rows = [row for _, row in fetch_health.schedule_frame(symbols_df).iterrows()]
 
-    print("🚀 Fetching data with multi-threading...\n")
+    print("🚀 Fetching and evaluating in a pipelined run...\n")
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
+    progress = tqdm(total=len(rows))
 
-        futures = [executor.submit(process_stock, row) for _, row in symbols_df.iterrows()]
+    def fetch(row):
+        df = fetch_historical_candle_data(row['instrument_key'])
+        progress.update(1)
+        return df if df is not None and not df.empty else None
 
-        for future in tqdm(as_completed(futures), total=len(futures)):
-            result = future.result()
-            if result:
-                all_trades.extend(result)
+    def publish(name, results):
 
-    if all_trades:
+        all_trades = [trade for trades in results for trade in trades]
+
+        if not all_trades:
+            print("⚠️ No trades generated")
+            return
 
         final_df = pd.DataFrame(all_trades)
 
@@ -228,10 +140,14 @@ def main():
             ["Stock","Date","Action","Price","RSI","Ratio","Underlying"]
         ]
 
-        update_sheet(final_df, client)
+        results_sink.record_outputs('srtetf', {name: final_df})
+
+        if results_sink.publish_enabled():
+            update_sheet(final_df, client)
 
-    else:
-        print("⚠️ No trades generated")
+    # fetches (I/O) overlap with indicator + strategy work on symbols already fetched
+    pipeline.run_pipeline([('SRT-ETF', rows)], fetch, compute_stock, publish, fetch_workers=10)
+    progress.close()
 
 
 if __name__ == "__main__":
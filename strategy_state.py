@@ -0,0 +1,205 @@
+import sys
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+import candle_store
+import results_sink
+import rule_engine
+
+# Persisted per-symbol strategy state, so the SRT scans only walk new bars.
+#
+# For each (strategy, symbol) results.db keeps the rule_engine state after the
+# last processed bar (observing / holding / buy price), that bar's date, a
+# fingerprint of the closes up to it and of the strategy's rules, plus every
+# Buy / Sell event emitted so far (the ledger).
+#
+# A run recomputes indicators on the fetched history (array work), restores the
+# state and scans only the bars after the stored date; new events are appended
+# to the ledger. If the rules changed, or any close up to the stored bar
+# differs (corporate action adjustment, a corrected candle, a shorter history),
+# the symbol is replayed from its first bar and its ledger rewritten.
+#
+#   python strategy_state.py status [STRATEGY]
+#   python strategy_state.py reset STRATEGY [SYMBOL ...]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS strategy_state (
+    strategy   TEXT NOT NULL,
+    symbol     TEXT NOT NULL,
+    rules      TEXT NOT NULL,
+    last_date  TEXT NOT NULL,
+    bars       INTEGER NOT NULL,
+    history    TEXT NOT NULL,
+    observing  INTEGER NOT NULL,
+    holding    INTEGER NOT NULL,
+    buy_price  REAL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (strategy, symbol)
+);
+CREATE TABLE IF NOT EXISTS strategy_events (
+    strategy  TEXT NOT NULL,
+    symbol    TEXT NOT NULL,
+    date      TEXT NOT NULL,
+    action    TEXT NOT NULL,
+    price     REAL,
+    rsi       REAL,
+    ratio     REAL,
+    buy_price REAL
+);
+CREATE INDEX IF NOT EXISTS strategy_events_symbol ON strategy_events (strategy, symbol);
+"""
+
+
+def connect():
+    conn = results_sink.connect()
+    with candle_store.WRITE_LOCK:
+        conn.executescript(_SCHEMA)
+    return conn
+
+
+def rules_fingerprint(rules):
+    return hashlib.sha1(json.dumps({r: rules[r] for r in rule_engine.RULES}, sort_keys=True).encode()).hexdigest()
+
+
+def history_fingerprint(close):
+    return hashlib.sha1(np.ascontiguousarray(close, dtype=float).tobytes()).hexdigest()
+
+
+def _stored(conn, strategy, symbols):
+    rows = conn.execute(
+        'SELECT symbol, rules, last_date, bars, history, observing, holding, buy_price '
+        'FROM strategy_state WHERE strategy = ?', (strategy,)).fetchall()
+    wanted = set(symbols)
+    return {r[0]: r[1:] for r in rows if r[0] in wanted}
+
+
+# ==============================
+# ADVANCE
+# ==============================
+def advance(conn, strategy, histories, rules=None):
+    # histories: {symbol: DataFrame with LTP or Close}
+    # -> (new events DataFrame, symbols replayed from their first bar)
+    rules = rules or rule_engine.STRATEGIES[strategy]
+    fingerprint = rules_fingerprint(rules)
+    bars = rule_engine.from_histories(histories)
+    n = len(bars.symbols)
+
+    state = rule_engine.initial_state(n)
+    start = bars.pad.copy()
+    replay = []
+    stored = _stored(conn, strategy, bars.symbols)
+
+    for j, symbol in enumerate(bars.symbols):
+        row = stored.get(symbol)
+        if row is not None:
+            rules_fp, last_date, n_bars, history, observing, holding, buy_price = row
+            closes = bars.close[bars.pad[j]:, j]
+            if (rules_fp == fingerprint and n_bars <= len(closes)
+                    and bars.indexes[j][n_bars - 1] == pd.Timestamp(last_date)
+                    and history_fingerprint(closes[:n_bars]) == history):
+                start[j] = bars.pad[j] + n_bars
+                state['observing'][j] = bool(observing)
+                state['holding'][j] = bool(holding)
+                state['buy_price'][j] = np.nan if buy_price is None else buy_price
+                continue
+        replay.append(symbol)
+
+    events, state = rule_engine.scan(bars, rules, state=state, start=start)
+
+    now = datetime.now(results_sink.TIME_ZONE).isoformat(timespec='seconds')
+    with candle_store.writing(conn):
+        for symbol in replay:
+            conn.execute('DELETE FROM strategy_events WHERE strategy = ? AND symbol = ?', (strategy, symbol))
+        conn.executemany(
+            'INSERT INTO strategy_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(strategy, ev.SYMBOL, pd.Timestamp(ev.Date).isoformat(), ev.Action, _real(ev.Price), _real(ev.RSI),
+              _real(ev.Ratio), _real(ev.BUY_PRICE)) for ev in events.itertuples(index=False)],
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO strategy_state VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(strategy, symbol, fingerprint, pd.Timestamp(bars.indexes[j][-1]).isoformat(), len(bars.indexes[j]),
+              history_fingerprint(bars.close[bars.pad[j]:, j]), int(state['observing'][j]), int(state['holding'][j]),
+              _real(state['buy_price'][j]), now)
+             for j, symbol in enumerate(bars.symbols)],
+        )
+    return events, replay
+
+
+def _real(value):
+    return None if value is None or value != value else float(value)
+
+
+# ==============================
+# LEDGER
+# ==============================
+def ledger_events(conn, strategy, symbols=None):
+    query = ('SELECT symbol AS SYMBOL, date AS Date, action AS Action, price AS Price, rsi AS RSI, ratio AS Ratio, '
+             'buy_price AS BUY_PRICE FROM strategy_events WHERE strategy = ?')
+    params = [strategy]
+    if symbols is not None:
+        symbols = list(symbols)
+        query += f" AND symbol IN ({', '.join('?' * len(symbols))})"
+        params += symbols
+    df = pd.read_sql_query(query + ' ORDER BY rowid', conn, params=params)
+    df['Date'] = [pd.Timestamp(d) for d in df['Date']]
+    return df
+
+
+def ledger_trades(conn, strategy, symbol, **extra):
+    # trade rows for one symbol as stored, without scanning anything
+    return rule_engine.trades(ledger_events(conn, strategy, [symbol]), **extra)
+
+
+def evaluate(strategy, df, stock_name, conn=None, **extra):
+    # per-symbol entry point for the SRT scripts: advances the stored state
+    # over new bars and returns the symbol's full ledger
+    if df is None or df.empty:
+        return []
+    own = conn is None
+    conn = conn or connect()
+    try:
+        advance(conn, strategy, {stock_name: df})
+        return ledger_trades(conn, strategy, stock_name, **extra)
+    finally:
+        if own:
+            conn.close()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('status', 'reset'):
+        print("Usage: python strategy_state.py status [STRATEGY] | reset STRATEGY [SYMBOL ...]")
+        return
+
+    conn = connect()
+    try:
+        if sys.argv[1] == 'status':
+            query = ('SELECT strategy, COUNT(*) AS symbols, SUM(holding) AS holding, SUM(observing) AS observing, '
+                     'MAX(last_date) AS last_bar, MAX(updated_at) AS updated FROM strategy_state')
+            params = ()
+            if len(sys.argv) > 2:
+                query += ' WHERE strategy = ?'
+                params = (sys.argv[2],)
+            print(pd.read_sql_query(query + ' GROUP BY strategy', conn, params=params).to_string(index=False))
+            return
+
+        if len(sys.argv) < 3:
+            print("⚠️ reset needs a strategy name")
+            return
+        strategy, symbols = sys.argv[2], sys.argv[3:]
+        where, params = 'strategy = ?', [strategy]
+        if symbols:
+            where += f" AND symbol IN ({', '.join('?' * len(symbols))})"
+            params += symbols
+        with candle_store.writing(conn):
+            conn.execute(f'DELETE FROM strategy_events WHERE {where}', params)
+            removed = conn.execute(f'DELETE FROM strategy_state WHERE {where}', params).rowcount
+        print(f"🔄 Reset {removed} symbol state(s) for {strategy}; they replay in full on the next run")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import gc
+import glob
+import json
+import hashlib
+import argparse
+import resource
+import pandas as pd
+from datetime import datetime
+
+import candle_store
+import indicators
+import price_panel
+import results_sink
+
+# Full-market scan in fixed-size chunks with a flat memory profile.
+#
+# The universe is every EQ row of the latest sec_bhavdata_full_*.csv. Symbols are
+# processed chunk by chunk: history is downloaded (or read from the price panel),
+# reduced to one indicator-table row per symbol and dropped straight away. Each
+# chunk's rows are spilled to data/spill/<run>/part-NNNNN.csv, so only one chunk
+# of history is ever held in memory; the parts are stitched together at the end.
+# data/spill/<run>/scan.json pins the chunk size and universe of the run, since
+# part N only covers the same symbols when both are unchanged on resume.
+
+SPILL_DIR = os.path.join(candle_store.DATA_DIR, 'spill')
+FULL_TABLE_PATH = os.path.join(candle_store.DATA_DIR, 'indicator_table_full.csv')
+
+# Rough in-memory cost of one bar once indicator columns are added.
+BYTES_PER_BAR = 20 * 8 * 2
+BARS_PER_YEAR = 250
+
+
+# ==============================
+# UNIVERSE
+# ==============================
+def latest_bhavcopy(pattern='sec_bhavdata_full_*.csv'):
+    files = glob.glob(pattern)
+    if not files:
+        return None
+
+    def file_date(path):
+        stamp = os.path.basename(path).rsplit('_', 1)[-1].split('.')[0]
+        try:
+            return datetime.strptime(stamp, '%d%m%Y')
+        except ValueError:
+            return datetime.min
+
+    return max(files, key=file_date)
+
+
+def read_bhavcopy(path):
+    df = pd.read_csv(path, skipinitialspace=True)
+    df.columns = df.columns.str.strip()
+    for col in df.select_dtypes(include='object').columns:
+        df[col] = df[col].str.strip()
+    return df
+
+
+def bhavcopy_universe(path, series='EQ'):
+    df = read_bhavcopy(path)
+    return df.loc[df['SERIES'] == series, 'Symbol'].drop_duplicates().tolist()
+
+
+# ==============================
+# CHUNKING
+# ==============================
+def chunk_size_for_budget(memory_mb, years):
+    per_symbol = max(1, int(years * BARS_PER_YEAR * BYTES_PER_BAR))
+    return max(1, int(memory_mb * 1024 * 1024 // per_symbol))
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ==============================
+# SOURCES (yield (symbol, history) for one chunk)
+# ==============================
+def yfinance_source(years):
+    def load(symbols):
+        histories = indicators.download_histories(symbols, years=years)
+        for symbol in symbols:
+            yield symbol, histories.pop(symbol, None)
+    return load
+
+
+def panel_source(panel):
+    # the panel is memory-mapped, so only the symbols being read are paged in
+    def load(symbols):
+        for symbol in symbols:
+            yield symbol, panel.frame(symbol) if symbol in panel else None
+    return load
+
+
+# ==============================
+# SCAN
+# ==============================
+def _check_layout(spill_dir, symbols, chunk_size):
+    layout = {'chunk_size': chunk_size, 'symbols': hashlib.sha1('\n'.join(symbols).encode()).hexdigest()}
+    path = os.path.join(spill_dir, 'scan.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f)
+        if stored != layout:
+            raise ValueError(
+                f"Run {os.path.basename(spill_dir)} was spilled with chunk size {stored.get('chunk_size')} "
+                f"over a different universe or chunk size; resume with --chunk-size {stored.get('chunk_size')} "
+                f"and the same bhavcopy, or use a new --run-key")
+    else:
+        with open(path, 'w') as f:
+            json.dump(layout, f)
+    return path
+
+
+def scan(symbols, load, chunk_size, run_key=None, keep_parts=False):
+
+    run_key = run_key or datetime.now().strftime('%Y%m%d-%H%M%S')
+    spill_dir = os.path.join(SPILL_DIR, run_key)
+    os.makedirs(spill_dir, exist_ok=True)
+    layout = _check_layout(spill_dir, symbols, chunk_size)
+
+    done_parts = sorted(glob.glob(os.path.join(spill_dir, 'part-*.csv')))
+    parts = list(done_parts)
+
+    for n, chunk in enumerate(chunks(symbols, chunk_size)):
+        part = os.path.join(spill_dir, f"part-{n:05d}.csv")
+        if part in done_parts:
+            continue
+
+        rows = {}
+        for symbol, df in load(chunk):
+            try:
+                if df is not None and not df.empty:
+                    row = indicators.summarize(df)
+                    if row:
+                        rows[symbol] = row
+            except Exception as e:
+                print(f"Error processing {symbol}: {e}")
+            # history is released as soon as it has been reduced to one row
+            del df
+
+        table = pd.DataFrame.from_dict(rows, orient='index')
+        table.index.name = 'SYMBOL'
+        table.to_csv(part + '.tmp')
+        os.replace(part + '.tmp', part)
+        parts.append(part)
+
+        del rows, table
+        gc.collect()
+        print(f"📦 Chunk {n + 1}: {len(chunk)} symbols, peak RSS {peak_rss_mb():.0f} MB")
+
+    out = merge_parts(parts, spill_dir, keep_parts)
+    if not keep_parts:
+        os.remove(layout)
+        os.rmdir(spill_dir)
+    return out
+
+
+def merge_parts(parts, spill_dir, keep_parts=False):
+    # Parts without rows (a chunk with no usable history) are skipped; the
+    # output header is the union of the part headers, and a part with other
+    # columns is realigned, so every row lands under its own column.
+    parts = sorted(parts)
+    headers = {}
+    for part in parts:
+        with open(part) as f:
+            header = f.readline().rstrip('\n')
+            if header.strip() and f.readline().strip():
+                headers[part] = header
+
+    columns = []
+    for header in headers.values():
+        columns += [c for c in header.split(',') if c not in columns]
+    merged = ','.join(columns)
+
+    os.makedirs(os.path.dirname(FULL_TABLE_PATH) or '.', exist_ok=True)
+    tmp = FULL_TABLE_PATH + '.tmp'
+    with open(tmp, 'w') as out:
+        out.write(merged + '\n')
+        for part, header in headers.items():
+            if header == merged:
+                with open(part) as f:
+                    f.readline()
+                    for line in f:
+                        out.write(line)
+            else:
+                pd.read_csv(part, dtype=str, keep_default_na=False).reindex(columns=columns).to_csv(out, header=False, index=False)
+    os.replace(tmp, FULL_TABLE_PATH)
+
+    if not keep_parts:
+        for part in parts:
+            os.remove(part)
+    return FULL_TABLE_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bounded-memory full-market SST scan")
+    parser.add_argument('--bhavcopy', help='bhavcopy CSV (default: latest sec_bhavdata_full_*.csv)')
+    parser.add_argument('--source', choices=['yfinance', 'panel'], default='yfinance')
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--memory-mb', type=float, default=256, help='history held in memory per chunk')
+    parser.add_argument('--chunk-size', type=int, help='override the budget-derived chunk size')
+    parser.add_argument('--run-key', help='reuse a run key to resume from already spilled chunks')
+    parser.add_argument('--keep-parts', action='store_true')
+    parser.add_argument('--save', action='store_true', help='also record the table in the results store')
+    args = parser.parse_args()
+
+    path = args.bhavcopy or latest_bhavcopy()
+    if not path:
+        print("⚠️ No bhavcopy file found")
+        return
+
+    symbols = bhavcopy_universe(path)
+    chunk_size = args.chunk_size or chunk_size_for_budget(args.memory_mb, args.years)
+    if args.source == 'panel':
+        panel = price_panel.open_panel()
+        if panel is None:
+            print("⚠️ No price panel found")
+            return
+        load = panel_source(panel)
+    else:
+        load = yfinance_source(args.years)
+
+    print(f"🚀 {len(symbols)} EQ symbols from {os.path.basename(path)}, {chunk_size} per chunk")
+    out = scan(symbols, load, chunk_size, run_key=args.run_key, keep_parts=args.keep_parts)
+    print(f"✅ Full-market table -> {out} (peak RSS {peak_rss_mb():.0f} MB)")
+
+    if args.save:
+        results_sink.record_outputs('streaming_scan', {'SST-FULL': pd.read_csv(out)})
+
+
+if __name__ == "__main__":
+    main()
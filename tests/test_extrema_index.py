@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+import extrema_index
+
+
+def _frame(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 2, n).cumsum()
+    return pd.DataFrame({'High': close + rng.integers(0, 4, n), 'Low': close - rng.integers(0, 4, n)})
+
+
+def _rolling_low_touch(df, window):
+    hits = np.flatnonzero(df['Low'] == df['Low'].rolling(window).min())
+    return int(hits[-1]) if len(hits) else None
+
+
+def _rolling_breakout(df, after, window):
+    prev_high = df['High'].rolling(window).max().shift(1)
+    hits = [pos for pos in np.flatnonzero(df['High'] >= prev_high) if pos > after]
+    return int(hits[0]) if hits else None
+
+
+def test_rolling_questions_match_pandas_rolling():
+    df = _frame()
+    idx = extrema_index.ExtremaIndex(df['High'], df['Low'])
+    for window in (1, 5, 20, 52):
+        np.testing.assert_array_equal([idx.rolling_max(p, window) for p in range(len(df))], df['High'].rolling(window).max())
+        np.testing.assert_array_equal([idx.rolling_min(p, window) for p in range(len(df))], df['Low'].rolling(window).min())
+        assert idx.last_low_touch(window) == _rolling_low_touch(df, window)
+        for after in (0, 30, 150, 299):
+            assert idx.first_breakout(after, window) == _rolling_breakout(df, after, window)
+
+
+def test_nan_bars_are_skipped_not_spread():
+    # rolling(20) returns NaN for any window holding a missing bar; the index
+    # ignores it, which is why callers drop the pre-listing rows first
+    df = _frame(60)
+    df.loc[:9, ['High', 'Low']] = np.nan
+    idx = extrema_index.ExtremaIndex(df['High'], df['Low'])
+    assert np.isnan(df['Low'].rolling(20).min().iloc[20])
+    assert idx.rolling_min(20, 20) == df['Low'].iloc[10:21].min()
+
+    listed = df.dropna(how='all').reset_index(drop=True)
+    dropped = extrema_index.ExtremaIndex(listed['High'], listed['Low'])
+    np.testing.assert_array_equal([dropped.rolling_min(p, 20) for p in range(len(listed))], listed['Low'].rolling(20).min())
+    assert dropped.last_low_touch(20) == _rolling_low_touch(listed, 20)
@@ -0,0 +1,104 @@
+import functools
+import pandas as pd
+
+import candle_store
+import fetch_health
+import fetch_planner
+import trading_calendar
+
+INSTRUMENT = 'NSE_EQ|INF000000001'
+
+
+def _store(tmp_path, monkeypatch):
+    connect = functools.partial(candle_store.connect, str(tmp_path / 'market.db'))
+    monkeypatch.setattr(candle_store, 'connect', connect)
+    monkeypatch.setattr(trading_calendar, '_default', trading_calendar.TradingCalendar.from_local())
+    return connect
+
+
+def _no_new_bars(monkeypatch):
+    empty = pd.DataFrame(columns=candle_store.CANDLE_COLUMNS)
+    monkeypatch.setattr(fetch_planner, 'fetch_range', lambda *args, **kwargs: empty)
+
+
+def _failures(conn):
+    health = fetch_health.load_health(conn, [INSTRUMENT])
+    return int(health.loc[INSTRUMENT, 'failures']) if INSTRUMENT in health.index else 0
+
+
+def _save_history(connect, last):
+    dates = pd.bdate_range('2025-06-02', last, tz='Asia/Kolkata')
+    conn = connect()
+    candle_store.save_candles(conn, INSTRUMENT, pd.DataFrame({c: 100.0 for c in candle_store.CANDLE_COLUMNS}, index=dates))
+    conn.close()
+    return dates
+
+
+def test_stored_instrument_with_empty_incremental_response_is_not_quarantined(tmp_path, monkeypatch):
+    # only the latest session is missing: it may simply not be published yet
+    connect = _store(tmp_path, monkeypatch)
+    _no_new_bars(monkeypatch)
+    dates = _save_history(connect, '2025-07-03')
+
+    for _ in range(fetch_health.QUARANTINE_AFTER + 1):
+        df = fetch_planner.sync_daily_candles(INSTRUMENT, '2025-06-02', end='2025-07-04')
+        assert len(df) == len(dates)
+
+    conn = connect()
+    try:
+        assert _failures(conn) == 0
+        to_fetch, skipped = fetch_health.schedule(conn, [INSTRUMENT])
+        assert to_fetch == [INSTRUMENT] and skipped == []
+    finally:
+        conn.close()
+
+
+def test_stored_instrument_that_stops_returning_bars_is_quarantined(tmp_path, monkeypatch):
+    # a week of completed sessions still empty on every run (e.g. delisted)
+    connect = _store(tmp_path, monkeypatch)
+    _no_new_bars(monkeypatch)
+    _save_history(connect, '2025-06-27')
+
+    for _ in range(fetch_health.QUARANTINE_AFTER):
+        fetch_planner.sync_daily_candles(INSTRUMENT, '2025-06-02', end='2025-07-04')
+
+    conn = connect()
+    try:
+        assert _failures(conn) == fetch_health.QUARANTINE_AFTER
+        to_fetch, skipped = fetch_health.schedule(conn, [INSTRUMENT])
+        assert to_fetch == [] and skipped == [INSTRUMENT]
+    finally:
+        conn.close()
+
+
+def test_instrument_without_history_counts_empty_responses(tmp_path, monkeypatch):
+    connect = _store(tmp_path, monkeypatch)
+    _no_new_bars(monkeypatch)
+
+    for _ in range(fetch_health.QUARANTINE_AFTER):
+        fetch_planner.sync_daily_candles(INSTRUMENT, '2025-06-02', end='2025-07-04')
+
+    conn = connect()
+    try:
+        assert _failures(conn) == fetch_health.QUARANTINE_AFTER
+    finally:
+        conn.close()
+
+
+def test_plan_backfills_from_start_when_nothing_is_stored(tmp_path, monkeypatch):
+    connect = _store(tmp_path, monkeypatch)
+    conn = connect()
+    try:
+        fetch_planner._ensure_schema(conn)
+        conn.execute('INSERT INTO fetch_coverage VALUES (?, ?)', (INSTRUMENT, '2025-01-01'))
+        calendar = trading_calendar.TradingCalendar.from_local()
+        planned = fetch_planner.plan_instrument(conn, calendar, INSTRUMENT, '2025-06-02', '2025-07-04')
+        assert planned == [fetch_planner.FetchRequest(INSTRUMENT, pd.Timestamp('2025-06-02'), pd.Timestamp('2025-07-04'))]
+    finally:
+        conn.close()
+
+
+def test_2026_holidays_are_listed():
+    calendar = trading_calendar.TradingCalendar.from_local()
+    assert calendar.missing_years('2024-01-01', '2026-12-31') == []
+    assert not calendar.is_session('2026-01-26')
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+import funnel
+
+
+def test_srt_zones_follow_each_strategys_thresholds():
+    # ratio 0.93 / RSI 38 is only near SRT-ETF's observation zone (0.95 / 35)
+    values = {'RATIO': pd.Series([0.93, 0.81, 1.0, 1.28]), 'RSI': pd.Series([38.0, 33.0, 50.0, 50.0])}
+
+    entry, exit_ = funnel.srt_zones(values, 0.02, 5.0, ['SRT-N200'])
+    np.testing.assert_array_equal(entry, [False, True, False, False])
+    np.testing.assert_array_equal(exit_, [False, False, False, True])
+
+    entry, exit_ = funnel.srt_zones(values, 0.02, 5.0, ['SRT-ETF'])
+    np.testing.assert_array_equal(entry, [True, True, False, False])
+    np.testing.assert_array_equal(exit_, [False, False, False, True])
+
+    entry, _ = funnel.srt_zones(values, 0.02, 5.0)
+    np.testing.assert_array_equal(entry, [True, True, False, False])
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+def _history(n=200, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1000.0},
+                        index=pd.date_range('2024-01-01', periods=n, freq='B', tz='Asia/Kolkata'))
+
+
+def test_cache_reuses_unchanged_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(indicators, 'INDICATOR_CACHE_DIR', str(tmp_path))
+    df = _history()
+    first = indicators.cached_indicators('NSE_EQ|X', df)
+
+    def recompute(df):
+        raise AssertionError('unchanged history was recomputed')
+
+    monkeypatch.setattr(indicators, 'compute_indicators', recompute)
+    pd.testing.assert_frame_equal(indicators.cached_indicators('NSE_EQ|X', df.copy()), first)
+
+
+def test_back_adjusted_history_misses_the_cache(tmp_path, monkeypatch):
+    # a 1:2 split applied before the last bar keeps length, last date and last close
+    monkeypatch.setattr(indicators, 'INDICATOR_CACHE_DIR', str(tmp_path))
+    df = _history()
+    indicators.cached_indicators('NSE_EQ|X', df)
+
+    adjusted = df.copy()
+    adjusted.iloc[:-1, :4] = adjusted.iloc[:-1, :4] / 2
+    ind = indicators.cached_indicators('NSE_EQ|X', adjusted)
+    pd.testing.assert_frame_equal(ind, indicators.compute_indicators(adjusted))
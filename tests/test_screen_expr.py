@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import screen_expr
+
+TABLE = pd.DataFrame({'RSI_D': [10.0, 40.0, np.nan], 'GTT_UPDATE': ['NEW ADD', 'NO CHANGE', None]},
+                     index=['AAA', 'BBB', 'CCC'])
+
+
+@pytest.mark.parametrize('expr', [
+    'RSI_D < "a"',
+    'GTT_UPDATE > 3',
+    'RSI_D + "a" > 1',
+    'GTT_UPDATE * 2 == 1',
+    '-GTT_UPDATE < 0',
+])
+def test_type_errors_raise_screen_error(expr):
+    with pytest.raises(screen_expr.ScreenError):
+        screen_expr.compile_screen(expr)(TABLE)
+
+
+def test_valid_screens_still_match():
+    assert list(screen_expr.compile_screen('RSI_D * 2 < 30')(TABLE)) == ['AAA']
+    assert list(screen_expr.compile_screen('GTT_UPDATE == "NEW ADD" or -RSI_D < -30')(TABLE)) == ['AAA', 'BBB']
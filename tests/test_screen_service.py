@@ -0,0 +1,12 @@
+import pytest
+
+import screen_expr
+import screen_service
+
+
+def test_screen_without_expression_is_a_screen_error(tmp_path):
+    state = screen_service.ScreenState(panel_path=str(tmp_path / 'panel'), table_path=str(tmp_path / 'table.csv'),
+                                       screens_path=str(tmp_path / 'screens.txt'))
+    for expr in (None, '', '  '):
+        with pytest.raises(screen_expr.ScreenError):
+            state.screen(expr)
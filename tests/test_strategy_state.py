@@ -0,0 +1,37 @@
+import functools
+import numpy as np
+import pandas as pd
+
+import results_sink
+import strategy_state
+
+CLOSE = np.r_[np.linspace(100, 110, 150), np.linspace(110, 70, 15), np.linspace(72, 95, 20), np.linspace(95, 150, 40)]
+
+
+def _history(bars=len(CLOSE)):
+    return pd.DataFrame({'Close': CLOSE[:bars]}, index=pd.bdate_range('2024-01-01', periods=bars))
+
+
+def _connect(tmp_path, monkeypatch):
+    monkeypatch.setattr(results_sink, 'connect', functools.partial(results_sink.connect, str(tmp_path / 'results.db')))
+    return strategy_state.connect()
+
+
+def test_rerun_after_committed_state_still_returns_the_full_ledger(tmp_path, monkeypatch):
+    # a crash after the state commit but before the run journal line: the
+    # retry scans no new bar, yet must still report the symbol's trades
+    conn = _connect(tmp_path, monkeypatch)
+    first = strategy_state.evaluate('SRT-N200', _history(), 'X', conn=conn)
+    assert [t['Action'] for t in first] == ['Buy', 'Sell', 'Profit/Loss']
+
+    assert strategy_state.evaluate('SRT-N200', _history(), 'X', conn=conn) == first
+    assert strategy_state.ledger_trades(conn, 'SRT-N200', 'X') == first
+
+
+def test_incremental_run_matches_a_full_replay(tmp_path, monkeypatch):
+    conn = _connect(tmp_path, monkeypatch)
+    strategy_state.evaluate('SRT-N200', _history(170), 'X', conn=conn)
+    incremental = strategy_state.evaluate('SRT-N200', _history(), 'X', conn=conn)
+
+    strategy_state.advance(conn, 'SRT-N200', {'Y': _history()})
+    assert [{**t, 'Stock': 'Y'} for t in incremental] == strategy_state.ledger_trades(conn, 'SRT-N200', 'Y')
@@ -0,0 +1,157 @@
+import os
+import pandas as pd
+import pytz
+from datetime import datetime, time
+
+import candle_store
+
+# NSE session calendar built from local data only:
+#   * nse_holidays.csv (published exchange holidays, extend it every year)
+#   * dates observed in the local candle store: a weekday on which no stored
+#     instrument has a bar is a holiday, a weekend date on which most of them
+#     do (budget Saturdays, special sessions) is a session.
+
+TIME_ZONE = pytz.timezone('Asia/Kolkata')
+
+HOLIDAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nse_holidays.csv')
+
+MARKET_CLOSE = time(15, 30)
+
+# Need at least this many instruments before trusting "nobody traded" as a holiday.
+MIN_INSTRUMENTS_FOR_INFERENCE = 5
+
+
+def _to_day(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(TIME_ZONE).tz_localize(None)
+    return ts.normalize()
+
+
+class TradingCalendar:
+
+    def __init__(self, holidays=(), extra_sessions=(), listed_years=None):
+        # listed_years: years covered by the published holiday list
+        self.listed_years = set(listed_years) if listed_years is not None else None
+        self.holidays = pd.DatetimeIndex(sorted({_to_day(d) for d in holidays}))
+        self.extra_sessions = pd.DatetimeIndex(sorted({_to_day(d) for d in extra_sessions}))
+        self._holiday_set = set(self.holidays)
+        self._extra_set = set(self.extra_sessions)
+
+    # ------------------------------
+    # construction
+    # ------------------------------
+    @classmethod
+    def from_local(cls, conn=None, holidays_path=HOLIDAYS_PATH):
+
+        holidays = []
+        if os.path.exists(holidays_path):
+            holidays = list(pd.to_datetime(pd.read_csv(holidays_path)['date']))
+        listed_years = {d.year for d in holidays}
+
+        extra = []
+        if conn is not None:
+            inferred_holidays, extra = _infer_from_store(conn)
+            holidays += inferred_holidays
+
+        return cls(holidays, extra, listed_years)
+
+    def missing_years(self, start, end):
+        # years in [start, end] with no published holidays: every weekday there
+        # would be treated as a session
+        if self.listed_years is None:
+            return []
+        return [y for y in range(_to_day(start).year, _to_day(end).year + 1) if y not in self.listed_years]
+
+    # ------------------------------
+    # queries
+    # ------------------------------
+    def is_session(self, day):
+        day = _to_day(day)
+        if day in self._extra_set:
+            return True
+        return day.weekday() < 5 and day not in self._holiday_set
+
+    def sessions(self, start, end):
+        start, end = _to_day(start), _to_day(end)
+        days = pd.bdate_range(start, end)
+        days = days[~days.isin(self.holidays)]
+        extra = self.extra_sessions[(self.extra_sessions >= start) & (self.extra_sessions <= end)]
+        return days.union(extra)
+
+    def previous_session(self, day):
+        day = _to_day(day) - pd.Timedelta(days=1)
+        while not self.is_session(day):
+            day -= pd.Timedelta(days=1)
+        return day
+
+    def last_session(self, day=None):
+        # latest session on or before the given day
+        day = _to_day(day if day is not None else datetime.now(TIME_ZONE))
+        return day if self.is_session(day) else self.previous_session(day)
+
+    def last_completed_session(self, now=None):
+        # latest session whose daily candle should already exist
+        now = now or datetime.now(TIME_ZONE)
+        if now.tzinfo is None:
+            now = TIME_ZONE.localize(now)
+        now = now.astimezone(TIME_ZONE)
+        today = _to_day(now)
+        if self.is_session(today) and now.time() >= MARKET_CLOSE:
+            return today
+        return self.previous_session(today)
+
+
+def _infer_from_store(conn):
+
+    rows = conn.execute('SELECT date, COUNT(*) FROM candles GROUP BY date').fetchall()
+    if not rows:
+        return [], []
+
+    counts = pd.Series({pd.Timestamp(d): n for d, n in rows}).sort_index()
+    n_instruments = conn.execute('SELECT COUNT(DISTINCT instrument) FROM candles').fetchone()[0]
+
+    holidays = []
+    if n_instruments >= MIN_INSTRUMENTS_FOR_INFERENCE:
+        weekdays = pd.bdate_range(counts.index[0], counts.index[-1])
+        holidays = list(weekdays[~weekdays.isin(counts.index)])
+
+    weekend = counts[counts.index.weekday >= 5]
+    extra = list(weekend[weekend >= max(1, 0.5 * counts.max())].index)
+    return holidays, extra
+
+
+_default = None
+
+
+def default_calendar():
+    global _default
+    if _default is None:
+        conn = None
+        try:
+            if os.path.exists(candle_store.DB_PATH):
+                conn = candle_store.connect()
+        except Exception as e:
+            print(f"Calendar: local candle store unavailable ({e}); using holiday list only")
+        _default = TradingCalendar.from_local(conn)
+        if conn is not None:
+            conn.close()
+        year = datetime.now(TIME_ZONE).year
+        if _default.missing_years(f'{year}-01-01', f'{year}-12-31'):
+            print(f"⚠️⚠️ {HOLIDAYS_PATH} has no holidays for {year}: every weekday is treated as an NSE session "
+                  f"(runs on exchange holidays, holiday fetches). Add the {year} NSE holiday list.")
+    return _default
+
+
+def is_session_today():
+    return default_calendar().is_session(datetime.now(TIME_ZONE))
+
+
+def skip_run():
+    # Scheduled runs do nothing on non-session days; FORCE_RUN=1 overrides.
+    if os.environ.get('FORCE_RUN', '').strip().lower() in ('1', 'true', 'yes'):
+        return False
+    if is_session_today():
+        return False
+    print(f"⏭️ {datetime.now(TIME_ZONE):%d-%b-%Y} is not an NSE session; skipping run (set FORCE_RUN=1 to override)")
+    return True